@@ -0,0 +1,187 @@
+"""Caches of recipe responses.
+
+Anonymous users always get false is_favorited, is_in_shopping_cart
+and is_subscribed, so their list and detail responses depend only on
+the URL. For authenticated users only these flags differ, so each
+recipe body is cached on its own and the flags are merged in.
+Cache keys carry versions from recipes.response_cache, which signals
+drop when recipes, their ingredients or authors change. Other processes
+only see the dropped versions with a shared cache, so the caching is
+controlled by RECIPE_RESPONSE_CACHE, off with the local memory cache.
+"""
+
+from hashlib import md5
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from rest_framework import status
+from rest_framework.response import Response
+
+from foodgram.metrics import record_cache
+from recipes.response_cache import (
+    get_list_version,
+    get_recipe_version,
+    get_recipe_versions,
+)
+
+CACHE_KEY = "recipe_response:{}:{}"
+FRAGMENT_KEY = "recipe_fragment:{}:{}:{}"
+
+
+def _url_hash(request):
+    # Absolute image URLs depend on the host, the order of parameters
+    # does not change the response.
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+    )
+    url = f"{request.build_absolute_uri(request.path)}?{query}"
+    return md5(url.encode(), usedforsecurity=False).hexdigest()
+
+
+def _host_hash(request):
+    return md5(
+        request.build_absolute_uri("/").encode(), usedforsecurity=False
+    ).hexdigest()
+
+
+class AnonymousCacheMixin:
+    """Caches list and retrieve responses of anonymous users."""
+
+    def _cache_key(self, request):
+        if self.action == "list":
+            version = f"list:{get_list_version()}"
+        else:
+            pk = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            if not pk.isdigit():
+                return None
+            version = f"{pk}:{get_recipe_version(pk)}"
+        return CACHE_KEY.format(version, _url_hash(request))
+
+    def _get_cached_response(self, key, request, handler, *args, **kwargs):
+        data = cache.get(key)
+        record_cache("recipe_responses", data is not None)
+        if data is not None:
+            return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(
+                key,
+                response.data,
+                timeout=settings.RECIPE_RESPONSE_CACHE_TIMEOUT,
+            )
+        return response
+
+    def _cached(self, request, handler, *args, **kwargs):
+        if request.user.is_authenticated:
+            response = handler(request, *args, **kwargs)
+            patch_cache_control(response, private=True)
+            return response
+
+        if not settings.RECIPE_RESPONSE_CACHE:
+            response = handler(request, *args, **kwargs)
+        else:
+            key = self._cache_key(request)
+            if key is None:
+                return handler(request, *args, **kwargs)
+            response = self._get_cached_response(
+                key, request, handler, *args, **kwargs
+            )
+        patch_cache_control(
+            response, public=True, max_age=settings.RECIPE_RESPONSE_MAX_AGE
+        )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, super().retrieve, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.action in ("list", "retrieve"):
+            patch_vary_headers(response, ("Authorization",))
+        return response
+
+
+class RecipeFragmentMixin:
+    """Builds recipe responses of authenticated users from fragments.
+
+    A fragment is the user-independent representation of a recipe,
+    cached by recipe id and version. The view queryset only selects
+    the page with is_favorited, is_in_shopping_cart and
+    is_author_subscribed annotations when use_fragments() is true, and
+    the view must provide get_detailed_queryset() for recipes missing
+    from the cache, which get_serializer() serializes.
+    """
+
+    def _get_fragments(self, recipes):
+        host = _host_hash(self.request)
+        versions = get_recipe_versions(recipe.pk for recipe in recipes)
+        keys = {
+            pk: FRAGMENT_KEY.format(pk, version, host)
+            for pk, version in versions.items()
+        }
+        fragments = cache.get_many(keys.values())
+        missing = [pk for pk, key in keys.items() if key not in fragments]
+        for pk in keys:
+            record_cache("recipe_fragments", pk not in missing)
+        if not missing:
+            return {pk: fragments[key] for pk, key in keys.items()}
+
+        detailed = list(self.get_detailed_queryset().filter(pk__in=missing))
+        for recipe in detailed:
+            recipe.is_favorited = False
+            recipe.is_in_shopping_cart = False
+            recipe.is_author_subscribed = False
+        fresh = {
+            keys[item["id"]]: item
+            for item in self.get_serializer(detailed, many=True).data
+        }
+        cache.set_many(fresh, timeout=settings.RECIPE_RESPONSE_CACHE_TIMEOUT)
+        fragments.update(fresh)
+        return {pk: fragments[key] for pk, key in keys.items()}
+
+    def get_representations(self, recipes):
+        fragments = self._get_fragments(recipes)
+        return [
+            {
+                **fragments[recipe.pk],
+                "author": {
+                    **fragments[recipe.pk]["author"],
+                    "is_subscribed": recipe.is_author_subscribed,
+                },
+                "is_favorited": recipe.is_favorited,
+                "is_in_shopping_cart": recipe.is_in_shopping_cart,
+            }
+            for recipe in recipes
+        ]
+
+    def use_fragments(self):
+        return (
+            settings.RECIPE_RESPONSE_CACHE
+            and self.request.user.is_authenticated
+        )
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fragments():
+            return super().list(request, *args, **kwargs)
+
+        recipes = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(recipes)
+        if page is None:
+            return Response(self.get_representations(list(recipes)))
+        return self.get_paginated_response(self.get_representations(page))
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_fragments():
+            return super().retrieve(request, *args, **kwargs)
+        return Response(self.get_representations([self.get_object()])[0])
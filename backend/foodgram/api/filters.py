@@ -1,21 +1,71 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    IntegerField,
+    OuterRef,
+    Q,
+    Value,
+    When,
+)
+from django import forms
 from django_filters.rest_framework import FilterSet, filters
 
-from recipes.models import Ingredient, Recipe
+from recipes.catalogue import CONTAINS_MIN_LENGTH
+from recipes.models import Ingredient, Recipe, RecipeIngredient
 
 
 class IngredientFilter(FilterSet):
-    """Filter for Ingredient model."""
+    """Filter for Ingredient model.
 
-    name = filters.CharFilter(field_name="name", lookup_expr="istartswith")
+    Names starting with the query go first, then names containing it.
+    Both lookups are served by expression indexes on UPPER(name) on
+    PostgreSQL and fall back to plain scans on other databases.
+    """
+
+    name = filters.CharFilter(method="filter_name")
 
     class Meta:
         model = Ingredient
         fields = ["name"]
 
+    def filter_name(self, ingredients, name, value):
+        if len(value) < CONTAINS_MIN_LENGTH:
+            return ingredients.filter(name__istartswith=value)
+
+        return (
+            ingredients.filter(name__icontains=value)
+            .annotate(
+                match_rank=Case(
+                    When(name__istartswith=value, then=Value(0)),
+                    default=Value(1),
+                    output_field=IntegerField(),
+                )
+            )
+            .order_by("match_rank", "name")
+        )
+
+
+class IntegerInFilter(filters.BaseInFilter, filters.NumberFilter):
+    """Comma separated list of integers."""
+
+    field_class = forms.IntegerField
+
 
 class RecipeFilter(FilterSet):
 
     author = filters.NumberFilter(field_name="author__id")
+    cooking_time_min = filters.NumberFilter(
+        field_name="cooking_time", lookup_expr="gte"
+    )
+    cooking_time_max = filters.NumberFilter(
+        field_name="cooking_time", lookup_expr="lte"
+    )
+    ingredients = IntegerInFilter(method="filter_ingredients")
+    exclude_ingredients = IntegerInFilter(method="filter_exclude_ingredients")
+    search = filters.CharFilter(method="filter_search")
     is_favorited = filters.BooleanFilter(method="filter_is_favorited")
     is_in_shopping_cart = filters.BooleanFilter(
         method="filter_is_in_shopping_cart"
@@ -23,7 +73,46 @@ class RecipeFilter(FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ["author", "is_favorited", "is_in_shopping_cart"]
+        fields = [
+            "author",
+            "cooking_time_min",
+            "cooking_time_max",
+            "ingredients",
+            "exclude_ingredients",
+            "is_favorited",
+            "is_in_shopping_cart",
+            "search",
+        ]
+
+    def filter_ingredients(self, recipes, name, value):
+        """Recipes with all of the ingredients.
+
+        PostgreSQL serves it by the GIN index on ingredient_ids,
+        other databases check each ingredient with a subquery.
+        """
+        if connections[recipes.db].vendor == "postgresql":
+            return recipes.filter(ingredient_ids__contains=value)
+        for ingredient_id in value:
+            recipes = recipes.filter(
+                Exists(
+                    RecipeIngredient.objects.filter(
+                        recipe=OuterRef("pk"), ingredient=ingredient_id
+                    )
+                )
+            )
+        return recipes
+
+    def filter_exclude_ingredients(self, recipes, name, value):
+        """Recipes with none of the ingredients."""
+        if connections[recipes.db].vendor == "postgresql":
+            return recipes.exclude(ingredient_ids__overlap=value)
+        return recipes.exclude(
+            Exists(
+                RecipeIngredient.objects.filter(
+                    recipe=OuterRef("pk"), ingredient__in=value
+                )
+            )
+        )
 
     def filter_is_favorited(self, recipes, name, value):
         current_user = self.request.user
@@ -36,3 +125,28 @@ class RecipeFilter(FilterSet):
         if current_user.is_authenticated and value:
             return recipes.filter(shoppingcarts__user=current_user)
         return recipes
+
+    def filter_search(self, recipes, name, value):
+        """Full-text search over names, ingredients and text.
+
+        PostgreSQL matches the trigger-maintained search_vector and orders
+        by rank, other databases fall back to icontains lookups.
+        """
+        if connections[recipes.db].vendor != "postgresql":
+            return recipes.filter(
+                Q(name__icontains=value)
+                | Q(text__icontains=value)
+                | Exists(
+                    RecipeIngredient.objects.filter(
+                        recipe=OuterRef("pk"),
+                        ingredient__name__icontains=value,
+                    )
+                )
+            )
+
+        query = SearchQuery(value, config="russian", search_type="websearch")
+        return (
+            recipes.filter(search_vector=query)
+            .annotate(search_rank=SearchRank(F("search_vector"), query))
+            .order_by("-search_rank", "name", "id")
+        )
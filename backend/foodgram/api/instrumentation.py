@@ -0,0 +1,189 @@
+"""Per-request SQL query instrumentation.
+
+QueryBudgetMiddleware counts the queries of each request and their
+time, reports them in the Server-Timing header and the
+"foodgram.queries" log and checks them against QUERY_BUDGETS.
+QueryStatsMixin adds the serializer time of DRF views.
+"""
+
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger("foodgram.queries")
+
+IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+
+
+def fingerprint(sql):
+    """SQL with the placeholder lists of IN lookups collapsed."""
+    return IN_LIST.sub("IN (...)", sql)
+
+
+class QueryStats:
+    """Execute wrapper collecting the queries of a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.serializer_duration = 0.0
+        self.fingerprints = Counter()
+        self.slow_queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.fingerprints[fingerprint(sql)] += 1
+            if duration * 1000 >= settings.SLOW_QUERY_MS:
+                self.slow_queries.append((sql, round(duration * 1000, 2)))
+
+    @contextmanager
+    def record(self):
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def time_serializer(self, to_representation):
+        @wraps(to_representation)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return to_representation(*args, **kwargs)
+            finally:
+                self.serializer_duration += time.perf_counter() - started
+
+        return timed
+
+    def duplicates(self):
+        return {
+            sql: count for sql, count in self.fingerprints.items() if count > 1
+        }
+
+    def server_timing(self, total):
+        return (
+            f'db;dur={self.duration * 1000:.1f};desc="{self.count} queries, '
+            f'{sum(self.duplicates().values())} duplicated", '
+            f"serializer;dur={self.serializer_duration * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+
+
+def get_query_budget(view_name):
+    return settings.QUERY_BUDGETS.get(view_name, settings.QUERY_BUDGET_DEFAULT)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _budget_message(view_name, stats, budget):
+    duplicates = "".join(
+        f"\n  {count}x {sql}" for sql, count in stats.duplicates().items()
+    )
+    return (
+        f"{view_name} ran {stats.count} queries, the budget is {budget}."
+        + (f" Duplicated queries:{duplicates}" if duplicates else "")
+    )
+
+
+class QueryBudgetMiddleware:
+    """Measures queries of each request against its view budget.
+
+    Queries of streaming responses made after the view returns
+    are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.query_stats = stats
+        started = time.perf_counter()
+        with stats.record():
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+
+        match = request.resolver_match
+        view_name = match.view_name if match else None
+        budget = get_query_budget(view_name)
+        over_budget = budget is not None and stats.count > budget
+
+        if settings.SERVER_TIMING:
+            # Keeps the phases set by api.profiling.ProfilingMixin
+            response["Server-Timing"] = ", ".join(
+                filter(
+                    None,
+                    (
+                        response.get("Server-Timing"),
+                        stats.server_timing(total),
+                    ),
+                )
+            )
+
+        record = {
+            "method": request.method,
+            "path": request.path,
+            "view": view_name,
+            "status": response.status_code,
+            "queries": stats.count,
+            "budget": budget,
+            "db_ms": round(stats.duration * 1000, 2),
+            "serializer_ms": round(stats.serializer_duration * 1000, 2),
+            "total_ms": round(total * 1000, 2),
+            "duplicates": stats.duplicates(),
+            "slow_queries": stats.slow_queries,
+        }
+        level = (
+            logging.WARNING
+            if over_budget or stats.slow_queries
+            else logging.INFO
+        )
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+
+        if over_budget and settings.QUERY_BUDGET_RAISE:
+            raise QueryBudgetExceeded(
+                _budget_message(view_name, stats, budget)
+            )
+        return response
+
+
+class QueryStatsMixin:
+    """Adds serializer time of a DRF view to the request query stats."""
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        stats = getattr(self.request, "query_stats", None)
+        if stats is not None:
+            serializer.to_representation = stats.time_serializer(
+                serializer.to_representation
+            )
+        return serializer
+
+
+@contextmanager
+def assert_query_budget(view_name=None, budget=None):
+    """Fails when the enclosed code runs more queries than the budget.
+
+    The budget is taken from QUERY_BUDGETS by view name unless given.
+    """
+    if budget is None:
+        budget = get_query_budget(view_name)
+    stats = QueryStats()
+    with stats.record():
+        yield stats
+    if budget is not None and stats.count > budget:
+        raise AssertionError(_budget_message(view_name, stats, budget))
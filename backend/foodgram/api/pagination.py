@@ -1,9 +1,191 @@
+import base64
+import binascii
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from foodgram.metrics import record_cache
 
 
 class SitePagination(PageNumberPagination):
-    """Pagination class for recipes and users."""
+    """Pagination class for recipes and users.
+
+    Pages are numbered unless the ``cursor`` query parameter is given
+    (empty for the first page). Then the rows following the cursor are
+    returned in the order of the view's ``cursor_ordering``, without
+    COUNT and OFFSET queries.
+    """
 
     page_size = 6
     page_size_query_param = "limit"
     max_page_size = 100
+    cursor_query_param = "cursor"
+    default_cursor_ordering = ("-id",)
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.ordering = getattr(
+            view, "cursor_ordering", self.default_cursor_ordering
+        )
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(
+                self._get_rows_after(
+                    self._decode_cursor(cursor, queryset.model)
+                )
+            )
+
+        page_size = self.get_page_size(request)
+        rows = list(queryset[: page_size + 1])
+        self.next_position = None
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            self.next_position = [
+                getattr(rows[-1], field.lstrip("-")) for field in self.ordering
+            ]
+        return rows
+
+    def _get_rows_after(self, position):
+        """Builds (a > x) OR (a = x AND b > y) ... for the ordering."""
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            lookup = "lt" if field.startswith("-") else "gt"
+            row_condition = Q(
+                **{f"{field.lstrip('-')}__{lookup}": position[i]}
+            )
+            for previous, value in zip(self.ordering[:i], position):
+                row_condition &= Q(**{previous.lstrip("-"): value})
+            condition |= row_condition
+        return condition
+
+    def _encode_cursor(self, position):
+        return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+    def _decode_cursor(self, cursor, model):
+        """Returns the cursor position with values of the field types."""
+        try:
+            position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (binascii.Error, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(
+            self.ordering
+        ):
+            raise NotFound(self.invalid_cursor_message)
+
+        try:
+            position = [
+                model._meta.get_field(field.lstrip("-")).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except ValidationError:
+            raise NotFound(self.invalid_cursor_message)
+        if None in position:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def _get_next_cursor_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self._encode_cursor(self.next_position),
+        )
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            {"next": self._get_next_cursor_link(), "results": data}
+        )
+
+
+class CountedPaginator(Paginator):
+    """Paginator with the count computed by the pagination class."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class CachedCountPagination(SitePagination):
+    """Page number pagination with cached or estimated counts.
+
+    Counts, exact or estimated, are cached per SQL of the filtered
+    queryset for PAGINATION_COUNT_CACHE_TIMEOUT seconds, or until the
+    version returned by the view's optional get_count_version()
+    changes. For unfiltered PostgreSQL tables larger than
+    PAGINATION_EXACT_COUNT_LIMIT rows the planner estimate from
+    pg_class.reltuples is returned instead, and ``count_is_exact``
+    in the response is false.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def _get_count_version(self):
+        get_count_version = getattr(self.view, "get_count_version", None)
+        return get_count_version() if get_count_version else ""
+
+    def django_paginator_class(self, queryset, page_size):
+        return CountedPaginator(queryset, page_size, self._get_count(queryset))
+
+    def _estimate_count(self, queryset):
+        connection = connections[queryset.db]
+        if queryset.query.where or connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE relname = %s",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 for tables that have never been analyzed.
+        if row is None or row[0] < settings.PAGINATION_EXACT_COUNT_LIMIT:
+            return None
+        return row[0]
+
+    def _get_count(self, queryset):
+        signature = hashlib.sha1(
+            str(queryset.values("pk").order_by().query).encode()
+        ).hexdigest()
+        cache_key = (
+            f"pagination_count:{self._get_count_version()}:{signature}"
+        )
+        # The estimate is cached too, it costs a query of its own
+        cached = cache.get(cache_key)
+        record_cache("pagination_count", cached is not None)
+        if cached is None:
+            count = self._estimate_count(queryset)
+            if count is None:
+                cached = (queryset.count(), True)
+            else:
+                cached = (count, False)
+            cache.set(
+                cache_key, cached, settings.PAGINATION_COUNT_CACHE_TIMEOUT
+            )
+        count, self.count_is_exact = cached
+        return count
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if not self.cursor_mode:
+            response.data["count_is_exact"] = self.count_is_exact
+        return response
@@ -0,0 +1,173 @@
+"""On-demand profiling of API requests.
+
+Staff users add ?_profile=1 to a request, PROFILE_SAMPLE_RATE profiles
+a share of all requests. Each profiled request leaves a cProfile dump
+and a JSON summary with the time of the request phases in PROFILE_DIR.
+"""
+
+import cProfile
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.utils import timezone
+
+PROFILE_PARAM = "_profile"
+
+
+class RequestProfile:
+    """cProfile run of a request with the time of its phases."""
+
+    def __init__(self, allowed, sampled):
+        # Allowed profiles are requested by staff and returned in headers
+        self.allowed = allowed
+        self.sampled = sampled
+        self.phases = {}
+        self.total = 0.0
+        self.started = None
+        self.profiler = cProfile.Profile()
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.profiler.enable()
+
+    def stop(self):
+        if self.started is None:
+            return
+        self.profiler.disable()
+        self.total = time.perf_counter() - self.started
+        self.started = None
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = (
+                self.phases.get(name, 0.0) + time.perf_counter() - started
+            )
+
+    def timed(self, name, method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.phase(name):
+                return method(*args, **kwargs)
+
+        return wrapper
+
+    def server_timing(self):
+        return ", ".join(
+            f"{name};dur={duration * 1000:.1f}"
+            for name, duration in self.phases.items()
+        )
+
+    def dump(self, view, request, response):
+        """Writes the .prof dump and the .json summary, returns their stem."""
+        os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+        stem = (
+            f"{timezone.now():%Y%m%d-%H%M%S}-{view.basename}-{view.action}-"
+            f"{uuid4().hex[:8]}"
+        )
+        path = os.path.join(settings.PROFILE_DIR, stem)
+        self.profiler.dump_stats(f"{path}.prof")
+        with open(f"{path}.json", "w", encoding="utf-8") as file:
+            json.dump(
+                {
+                    "method": request.method,
+                    "path": request.get_full_path(),
+                    "user": request.user.pk,
+                    "status": response.status_code,
+                    "sampled": self.sampled,
+                    "total_ms": round(self.total * 1000, 2),
+                    "phases_ms": {
+                        name: round(duration * 1000, 2)
+                        for name, duration in self.phases.items()
+                    },
+                },
+                file,
+                indent=2,
+            )
+        return stem
+
+
+class ProfilingMixin:
+    """Profiles requests of a DRF view on demand.
+
+    Profiling starts after authentication, permission and throttle
+    checks. The phases are parsing, filter backends, queryset
+    evaluation (pagination or get_object), serializer
+    to_representation and rendering.
+    """
+
+    profile = None
+
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        if self.profile is None:
+            return response
+
+        self.profile.stop()
+        stem = self.profile.dump(self, self.request, response)
+        if self.profile.allowed:
+            response["X-Profile"] = stem
+            response["Server-Timing"] = self.profile.server_timing()
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        # Authenticates the user first, so that only staff can make the
+        # server profile their requests
+        super().initial(request, *args, **kwargs)
+        allowed = (
+            request.query_params.get(PROFILE_PARAM) == "1"
+            and request.user.is_staff
+        )
+        sampled = random.random() < settings.PROFILE_SAMPLE_RATE
+        if not (allowed or sampled):
+            return
+        self.profile = RequestProfile(allowed, sampled)
+        self.profile.start()
+        with self.profile.phase("parse"):
+            request.data
+
+    def filter_queryset(self, queryset):
+        if self.profile is None:
+            return super().filter_queryset(queryset)
+        with self.profile.phase("filter"):
+            return super().filter_queryset(queryset)
+
+    def paginate_queryset(self, queryset):
+        if self.profile is None:
+            return super().paginate_queryset(queryset)
+        with self.profile.phase("queryset"):
+            return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        if self.profile is None:
+            return super().get_object()
+        with self.profile.phase("queryset"):
+            return super().get_object()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.profile is not None:
+            serializer.to_representation = self.profile.timed(
+                "serializer", serializer.to_representation
+            )
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.profile is not None and hasattr(response, "render"):
+            # Rendered here instead of by the handler to be measured
+            with self.profile.phase("render"):
+                response.render()
+            self.profile.stop()
+        return response
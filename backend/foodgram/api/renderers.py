@@ -0,0 +1,159 @@
+import csv
+import io
+import os
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _chunked(pieces, chunk_size=CHUNK_SIZE):
+    """Joins small byte strings into chunks of about chunk_size bytes."""
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def _error_lines(data):
+    """Converts an error payload into lines of text."""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield f"{key}: {value}"
+    elif data is not None:
+        yield str(data)
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """Falls back to the first renderer instead of raising 406.
+
+    The format is chosen with ``?format=``, clients sending
+    ``Accept: application/json`` still get a file.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            return renderers[0], renderers[0].media_type
+
+
+class BaseShoppingListRenderer(BaseRenderer):
+    """Base renderer for shopping list files.
+
+    Shopping lists are streamed with ``stream()``, ``render()`` is only
+    used by DRF for error responses of the download action.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return b"".join(self.render_lines(_error_lines(data)))
+
+    def prepare(self):
+        """Loads what stream() needs before the response is started.
+
+        Errors in the generator of a streaming response come after
+        the 200 status and would only truncate the file.
+        """
+
+    def stream(self, shopping_list):
+        return self.render_lines(shopping_list.lines())
+
+    def render_lines(self, lines):
+        raise NotImplementedError
+
+
+class ShoppingListTextRenderer(BaseShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def render_lines(self, lines):
+        return _chunked(f"{line}\n".encode(self.charset) for line in lines)
+
+
+class ShoppingListCSVRenderer(BaseShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    header = ("name", "measurement_unit", "amount")
+
+    def _rows(self, rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(row)
+            yield buffer.getvalue().encode(self.charset)
+            buffer.seek(0)
+            buffer.truncate()
+
+    def _with_header(self, rows):
+        yield self.header
+        yield from rows
+
+    def stream(self, shopping_list):
+        return _chunked(
+            self._rows(self._with_header(shopping_list.ingredients()))
+        )
+
+    def render_lines(self, lines):
+        return _chunked(self._rows((line,) for line in lines))
+
+
+@lru_cache
+def _register_pdf_font():
+    if not os.path.isfile(settings.SHOPPING_LIST_PDF_FONT):
+        raise ImproperlyConfigured(
+            f"SHOPPING_LIST_PDF_FONT {settings.SHOPPING_LIST_PDF_FONT} "
+            "does not exist"
+        )
+    font_name = "ShoppingListFont"
+    pdfmetrics.registerFont(
+        TTFont(font_name, settings.SHOPPING_LIST_PDF_FONT)
+    )
+    return font_name
+
+
+class ShoppingListPDFRenderer(BaseShoppingListRenderer):
+    media_type = "application/pdf"
+    format = "pdf"
+    charset = None
+    font_size = 11
+    line_height = 16
+    margin = 50
+
+    def prepare(self):
+        _register_pdf_font()
+
+    def render_lines(self, lines):
+        font_name = _register_pdf_font()
+        _, height = A4
+        with SpooledTemporaryFile(max_size=CHUNK_SIZE * 16) as file:
+            pdf = canvas.Canvas(file, pagesize=A4)
+            pdf.setFont(font_name, self.font_size)
+            y = height - self.margin
+            for line in lines:
+                if y < self.margin:
+                    pdf.showPage()
+                    pdf.setFont(font_name, self.font_size)
+                    y = height - self.margin
+                pdf.drawString(self.margin, y, line)
+                y -= self.line_height
+            pdf.save()
+
+            file.seek(0)
+            while chunk := file.read(CHUNK_SIZE):
+                yield chunk
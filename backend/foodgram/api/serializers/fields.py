@@ -1,17 +1,128 @@
 import base64
+import binascii
+from tempfile import SpooledTemporaryFile
+
+from PIL import Image, UnidentifiedImageError
 from rest_framework import serializers
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.base import File
+from django.core.files.storage import default_storage
+
+from recipes.images import variants_are_current
+
+# Characters of base64 data decoded at once
+BASE64_CHUNK_SIZE = 256 * 1024
+# In-memory part of a decoded upload, the rest goes to a temporary file
+SPOOL_MAX_SIZE = 1024 * 1024
 
 
 class Base64ImageField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith("data:image"):
-            if data.startswith("data:image"):
-                format, imgstr = data.split(";base64,")
-                ext = format.split("/")[-1]
-                data = ContentFile(
-                    base64.b64decode(imgstr), name="temp." + ext
+    """Image field accepting ``data:image/<type>;base64,<data>`` strings.
+
+    The type and the decoded size are checked before decoding, the data is
+    decoded chunk by chunk into a temporary file and the dimensions are
+    read from the image header.
+    """
+
+    default_error_messages = {
+        "invalid_base64": "Invalid base64 image data.",
+        "unsupported_type": "Unsupported image type {image_type}.",
+        "too_large": "Image size cannot exceed {max_size} bytes.",
+        "too_large_dimensions": "Image dimensions cannot exceed {max_dimension}px.",
+    }
+
+    def _decode(self, data, header_end):
+        # Encoders such as the base64 utility wrap lines at 76 characters
+        encoded_size = (
+            len(data)
+            - header_end
+            - data.count("\n", header_end)
+            - data.count("\r", header_end)
+        )
+        padding = data.rstrip()[-2:].count("=")
+        if encoded_size * 3 // 4 - padding > settings.IMAGE_UPLOAD_MAX_SIZE:
+            self.fail("too_large", max_size=settings.IMAGE_UPLOAD_MAX_SIZE)
+
+        file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        rest = ""
+        try:
+            for start in range(header_end, len(data), BASE64_CHUNK_SIZE):
+                chunk = rest + "".join(
+                    data[start:start + BASE64_CHUNK_SIZE].split()
                 )
+                # Without whitespace the chunk may not end on a quantum
+                end = len(chunk) - len(chunk) % 4
+                file.write(base64.b64decode(chunk[:end], validate=True))
+                rest = chunk[end:]
+            file.write(base64.b64decode(rest, validate=True))
+        except binascii.Error:
+            file.close()
+            self.fail("invalid_base64")
+        file.seek(0)
+        return file
+
+    def _check_dimensions(self, file):
+        max_dimension = settings.IMAGE_UPLOAD_MAX_DIMENSION
+        try:
+            # Image.open reads only the header, pixels stay undecoded.
+            with Image.open(file) as image:
+                width, height = image.size
+        except Image.DecompressionBombError:
+            # Pillow refuses headers declaring too many pixels
+            self.fail("too_large_dimensions", max_dimension=max_dimension)
+        except (UnidentifiedImageError, OSError):
+            self.fail("invalid_image")
+        finally:
+            file.seek(0)
+        if max(width, height) > max_dimension:
+            self.fail("too_large_dimensions", max_dimension=max_dimension)
+
+    def to_internal_value(self, data):
+        if not (isinstance(data, str) and data.startswith("data:")):
+            return super().to_internal_value(data)
+
+        header_end = data.find(";base64,", 0, 64)
+        if header_end == -1:
+            self.fail("invalid_base64")
+        image_type = data[len("data:"):header_end]
+        if image_type not in settings.IMAGE_UPLOAD_TYPES:
+            self.fail("unsupported_type", image_type=image_type)
+
+        file = self._decode(data, header_end + len(";base64,"))
+        try:
+            self._check_dimensions(file)
+            return super().to_internal_value(
+                File(file, name="temp." + image_type.split("/")[-1])
+            )
+        except Exception:
+            file.close()
+            raise
+
+
+class ImageVariantsField(serializers.Field):
+    """URLs of resized recipe images by variant name.
+
+    Falls back to the original image until the variants are generated.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
 
-        return super().to_internal_value(data)
+        request = self.context.get("request")
+        current = variants_are_current(recipe)
+        urls = {}
+        for name in settings.RECIPE_IMAGE_VARIANTS:
+            url = (
+                default_storage.url(recipe.image_variants[name])
+                if current
+                else recipe.image.url
+            )
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
@@ -1,5 +1,7 @@
+from django.conf import settings
 from rest_framework import serializers
 
+from recipes.catalogue import get_ingredient_catalogue
 from recipes.models import Ingredient, RecipeIngredient
 
 
@@ -25,13 +27,63 @@ class RecipeIngredientReadSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Resolves all ingredients of a recipe at once"""
+
+    default_error_messages = {
+        "does_not_exist": serializers.PrimaryKeyRelatedField.default_error_messages[
+            "does_not_exist"
+        ],
+    }
+
+    def _get_ingredients(self, ingredient_ids):
+        if not settings.INGREDIENT_CATALOGUE:
+            return Ingredient.objects.in_bulk(ingredient_ids)
+
+        catalogue = get_ingredient_catalogue()
+        ingredients = {}
+        missing = []
+        for ingredient_id in ingredient_ids:
+            ingredient = catalogue.get(ingredient_id)
+            if ingredient is None:
+                missing.append(ingredient_id)
+            else:
+                ingredients[ingredient_id] = ingredient
+        if missing:
+            # The snapshot of this process may predate the ingredients
+            ingredients.update(Ingredient.objects.in_bulk(missing))
+        return ingredients
+
+    def to_internal_value(self, data):
+        ingredients_data = super().to_internal_value(data)
+        ingredients = self._get_ingredients(
+            {item["ingredient"] for item in ingredients_data}
+        )
+
+        errors = [
+            {}
+            if item["ingredient"] in ingredients
+            else {
+                "id": [
+                    self.error_messages["does_not_exist"].format(
+                        pk_value=item["ingredient"]
+                    )
+                ]
+            }
+            for item in ingredients_data
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+
+        for item in ingredients_data:
+            item["ingredient"] = ingredients[item["ingredient"]]
+        return ingredients_data
+
+
 class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
     """Serializer for writing ingredient recipes"""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source="ingredient",
-    )
+    id = serializers.IntegerField(source="ingredient")
     amount = serializers.IntegerField(
         required=True,
         min_value=1,
@@ -40,3 +92,4 @@ class RecipeIngredientWriteSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ("id", "amount")
+        list_serializer_class = RecipeIngredientListSerializer
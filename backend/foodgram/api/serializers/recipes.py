@@ -1,14 +1,15 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 
-from recipes.models import Recipe, RecipeIngredient
+from recipes.models import Recipe, RecipeIngredient, ShoppingCartTotal
 from api.serializers.users import UserProfileSerializer
 from api.serializers.ingredients import (
     RecipeIngredientReadSerializer,
     RecipeIngredientWriteSerializer,
 )
-from api.serializers.fields import Base64ImageField
+from api.serializers.fields import Base64ImageField, ImageVariantsField
 
 
 User = get_user_model()
@@ -23,6 +24,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
@@ -34,12 +36,17 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "is_in_shopping_cart",
             "name",
             "image",
+            "image_variants",
             "text",
             "cooking_time",
         )
         fields = read_only_fields
 
-    def _get_exists_relation(self, recipe_obj, relation_name):
+    def _get_exists_relation(self, recipe_obj, relation_name, annotation):
+        # Querysets from RecipeViewSet already carry Exists() annotations.
+        if hasattr(recipe_obj, annotation):
+            return getattr(recipe_obj, annotation)
+
         request = self.context.get("request")
         return (
             request
@@ -50,10 +57,19 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         )
 
     def get_is_favorited(self, recipe_obj):
-        return self._get_exists_relation(recipe_obj, "favoriterecipes")
+        return self._get_exists_relation(
+            recipe_obj, "favoriterecipes", "is_favorited"
+        )
 
     def get_is_in_shopping_cart(self, recipe_obj):
-        return self._get_exists_relation(recipe_obj, "shoppingcarts")
+        return self._get_exists_relation(
+            recipe_obj, "shoppingcarts", "is_in_shopping_cart"
+        )
+
+    def to_representation(self, recipe_obj):
+        if hasattr(recipe_obj, "is_author_subscribed"):
+            recipe_obj.author.is_subscribed = recipe_obj.is_author_subscribed
+        return super().to_representation(recipe_obj)
 
 
 class RecipeWriteSerializer(serializers.ModelSerializer):
@@ -107,19 +123,83 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             ]
         )
 
+    def _get_ingredient_ids(self, ingredients_data):
+        return sorted(
+            ingredient_data["ingredient"].id
+            for ingredient_data in ingredients_data
+        )
+
     @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop("ingredients")
+        validated_data["ingredient_ids"] = self._get_ingredient_ids(
+            ingredients_data
+        )
         recipe = super().create(validated_data)
         self._create_recipe_ingredients(recipe, ingredients_data)
         return recipe
 
+    def _update_recipe_ingredients(self, recipe, ingredients_data):
+        """Writes only changed rows.
+
+        Returns amount changes by ingredient id.
+        """
+        recipe_ingredients = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        amount_changes = {}
+        to_create, to_update = [], []
+        for ingredient_data in ingredients_data:
+            ingredient_id = ingredient_data["ingredient"].id
+            amount = ingredient_data["amount"]
+            recipe_ingredient = recipe_ingredients.pop(ingredient_id, None)
+            if recipe_ingredient is None:
+                to_create.append(ingredient_data)
+                amount_changes[ingredient_id] = amount
+            elif recipe_ingredient.amount != amount:
+                amount_changes[ingredient_id] = (
+                    amount - recipe_ingredient.amount
+                )
+                recipe_ingredient.amount = amount
+                to_update.append(recipe_ingredient)
+
+        for ingredient_id, recipe_ingredient in recipe_ingredients.items():
+            amount_changes[ingredient_id] = -recipe_ingredient.amount
+
+        if recipe_ingredients:
+            RecipeIngredient.objects.filter(
+                id__in=[item.id for item in recipe_ingredients.values()]
+            ).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ["amount"])
+        self._create_recipe_ingredients(recipe, to_create)
+        return amount_changes
+
     @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop("ingredients")
-        instance.recipe_ingredients.all().delete()
-        self._create_recipe_ingredients(instance, ingredients_data)
-        return super().update(instance, validated_data)
+        amount_changes = self._update_recipe_ingredients(
+            instance, ingredients_data
+        )
+        ShoppingCartTotal.objects.apply_changes(
+            instance.shoppingcarts.values_list("user", flat=True),
+            amount_changes,
+        )
+        validated_data["ingredient_ids"] = self._get_ingredient_ids(
+            ingredients_data
+        )
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # image_variants is written by the image pipeline meanwhile
+        instance.save(update_fields=validated_data.keys())
+        return instance
 
     def to_representation(self, recipe):
+        prefetch_related_objects(
+            [recipe],
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.select_related("ingredient"),
+            ),
+        )
         return RecipeReadSerializer(recipe, context=self.context).data
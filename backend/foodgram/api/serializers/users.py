@@ -2,7 +2,7 @@ from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
 from recipes.models import User, Recipe
-from api.serializers.fields import Base64ImageField
+from api.serializers.fields import Base64ImageField, ImageVariantsField
 
 
 class UserProfileSerializer(UserSerializer):
@@ -16,12 +16,15 @@ class UserProfileSerializer(UserSerializer):
         fields = (*UserSerializer.Meta.fields, "is_subscribed", "avatar")
 
     def get_is_subscribed(self, user_profile):
+        if hasattr(user_profile, "is_subscribed"):
+            return user_profile.is_subscribed
+
         request = self.context.get("request")
         return (
             request is not None
             and not request.user.is_anonymous
             and request.user.is_authenticated
-            and user_profile.followers.filter(user=request.user).exists()
+            and user_profile.authors.filter(user=request.user).exists()
         )
 
     def get_avatar(self, user_profile):
@@ -52,9 +55,17 @@ class UserAvatarSerializer(serializers.ModelSerializer):
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Serializer for short recipe details."""
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        read_only_fields = ("id", "name", "image", "cooking_time")
+        read_only_fields = (
+            "id",
+            "name",
+            "image",
+            "image_variants",
+            "cooking_time",
+        )
         fields = read_only_fields
 
 
@@ -62,9 +73,7 @@ class UserWithRecipesSerializer(UserProfileSerializer):
     """Сериализатор для пользователя с его рецептами."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.IntegerField(
-        source="recipes.count", read_only=True
-    )
+    recipes_count = serializers.SerializerMethodField()
 
     class Meta(UserProfileSerializer.Meta):
         fields = (
@@ -74,13 +83,14 @@ class UserWithRecipesSerializer(UserProfileSerializer):
         )
 
     def get_recipes(self, user_obj):
-        return RecipeShortSerializer(
-            user_obj.recipes.all()[
-                : int(
-                    self.context.get("request").GET.get(
-                        "recipes_limit", 10**10
-                    )
-                )
-            ],
-            many=True,
-        ).data
+        # Prefetched recipes are already limited, slicing them is free.
+        recipes = user_obj.recipes.all()
+        recipes_limit = self.context.get("recipes_limit")
+        if recipes_limit is not None:
+            recipes = recipes[:recipes_limit]
+        return RecipeShortSerializer(recipes, many=True).data
+
+    def get_recipes_count(self, user_obj):
+        if hasattr(user_obj, "recipes_count"):
+            return user_obj.recipes_count
+        return user_obj.recipes.count()
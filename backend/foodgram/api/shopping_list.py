@@ -0,0 +1,61 @@
+from django.utils import timezone
+
+from recipes.models import Recipe, ShoppingCartTotal
+
+
+class ShoppingList:
+    """Shopping list of a user, read lazily from the database."""
+
+    title = "Фудграм - Список покупок"
+
+    def __init__(self, user):
+        self.user = user
+        self.created_at = timezone.now()
+
+    def ingredients(self):
+        """Yields ingredient totals of the cart."""
+        return (
+            ShoppingCartTotal.objects.filter(user=self.user)
+            .order_by("ingredient__name")
+            .values_list(
+                "ingredient__name",
+                "ingredient__measurement_unit",
+                "total_amount",
+            )
+            .iterator()
+        )
+
+    def recipes(self):
+        """Yields recipe names with their author names."""
+        return (
+            Recipe.objects.filter(shoppingcarts__user=self.user)
+            .order_by("name")
+            .values_list("name", "author__first_name", "author__last_name")
+            .iterator()
+        )
+
+    def lines(self):
+        """Yields the shopping list as lines of text."""
+        yield self.title
+        yield f"Дата: {self.created_at:%Y-%m-%d %H:%M:%S} UTC"
+        yield f"Пользователь: {self.user.username}"
+        yield ""
+        yield "Ингредиенты:"
+
+        for i, (name, measurement_unit, total_amount) in enumerate(
+            self.ingredients(), 1
+        ):
+            yield f"{i}. {name.title()} - {total_amount} {measurement_unit}"
+
+        yield ""
+        yield "Рецепты:"
+
+        for name, first_name, last_name in self.recipes():
+            author = f"{first_name} {last_name}".strip()
+            yield f"- {name} (автор: {author})"
+
+        yield ""
+        yield (
+            "Фудграм - Ваш кулинарный помощник "
+            f"© {self.created_at.year}"
+        )
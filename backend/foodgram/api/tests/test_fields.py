@@ -0,0 +1,50 @@
+import base64
+from io import BytesIO
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.serializers.fields import Base64ImageField
+
+
+def make_png():
+    buffer = BytesIO()
+    Image.new("RGB", (40, 30), "red").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    def decode(self, encoded):
+        image = Base64ImageField().to_internal_value(
+            f"data:image/png;base64,{encoded}"
+        )
+        with Image.open(image) as decoded:
+            return decoded.size
+
+    def test_single_line(self):
+        self.assertEqual(
+            self.decode(base64.b64encode(make_png()).decode()), (40, 30)
+        )
+
+    def test_wrapped_lines(self):
+        # base64 utility output, lines of 76 characters
+        encoded = base64.encodebytes(make_png()).decode()
+        self.assertEqual(self.decode(encoded), (40, 30))
+        self.assertEqual(self.decode(encoded.replace("\n", "\r\n")), (40, 30))
+
+    @patch("api.serializers.fields.BASE64_CHUNK_SIZE", 7)
+    def test_wrapped_lines_across_chunks(self):
+        encoded = base64.encodebytes(make_png()).decode()
+        self.assertEqual(self.decode(encoded), (40, 30))
+
+    def test_invalid_characters(self):
+        encoded = base64.b64encode(make_png()).decode()
+        with self.assertRaises(ValidationError):
+            self.decode(encoded[:40] + "*" + encoded[40:])
+
+    def test_truncated(self):
+        encoded = base64.b64encode(make_png()).decode()
+        with self.assertRaises(ValidationError):
+            self.decode(encoded[:-1])
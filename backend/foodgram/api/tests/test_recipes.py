@@ -0,0 +1,187 @@
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.instrumentation import assert_query_budget
+from api.serializers.recipes import RecipeWriteSerializer
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+PAGE_URL = "/api/recipes/?limit=100"
+
+
+@override_settings(RECIPE_RESPONSE_CACHE=True)
+class RecipeListQueriesTest(APITestCase):
+    """A full page of recipes costs a fixed number of queries.
+
+    The numbers are those of SQLite, the CI database. On PostgreSQL
+    an uncached COUNT of the unfiltered list is preceded by the
+    pg_class estimate, one query more.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="reader@example.com",
+            username="reader",
+            first_name="Reader",
+            last_name="Reader",
+            password="password",
+        )
+        authors = User.objects.bulk_create(
+            User(
+                email=f"author{i}@example.com",
+                username=f"author{i}",
+                first_name="Author",
+                last_name="Author",
+            )
+            for i in range(5)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ingredient {i}", measurement_unit="г")
+            for i in range(10)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=authors[i % len(authors)],
+                name=f"recipe {i:03d}",
+                text="text",
+                cooking_time=i + 1,
+                image="recipes/image.png",
+            )
+            for i in range(100)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(i + k) % len(ingredients)],
+                amount=k + 1,
+            )
+            for i, recipe in enumerate(recipes)
+            for k in range(3)
+        )
+        cls.favorited = recipes[0]
+        cls.in_cart = recipes[1]
+        FavoriteRecipe.objects.create(user=cls.user, recipe=cls.favorited)
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(user=cls.user, recipe=cls.in_cart)]
+        )
+        Subscription.objects.create(user=cls.user, author=authors[0])
+        cls.subscribed = authors[0]
+
+    def setUp(self):
+        cache.clear()
+
+    def get_page(self, queries):
+        with assert_query_budget("recipes-list"):
+            with self.assertNumQueries(queries):
+                response = self.client.get(PAGE_URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 100)
+        return {recipe["id"]: recipe for recipe in response.data["results"]}
+
+    def test_anonymous_page(self):
+        # COUNT, recipes with authors, ingredients
+        recipes = self.get_page(3)
+        for recipe in recipes.values():
+            self.assertFalse(recipe["is_favorited"])
+            self.assertFalse(recipe["is_in_shopping_cart"])
+            self.assertFalse(recipe["author"]["is_subscribed"])
+            self.assertEqual(len(recipe["ingredients"]), 3)
+        self.assertEqual(self.get_page(0), recipes)
+
+    @override_settings(RECIPE_RESPONSE_CACHE=False)
+    def test_anonymous_page_without_cache(self):
+        recipes = self.get_page(3)
+        # Recipes and ingredients, the count is cached
+        self.assertEqual(self.get_page(2), recipes)
+
+    def test_authenticated_page(self):
+        self.client.force_authenticate(self.user)
+        # COUNT, the page with flags, recipes with authors, ingredients
+        recipes = self.get_page(4)
+        for pk, recipe in recipes.items():
+            self.assertEqual(recipe["is_favorited"], pk == self.favorited.pk)
+            self.assertEqual(
+                recipe["is_in_shopping_cart"], pk == self.in_cart.pk
+            )
+            self.assertEqual(
+                recipe["author"]["is_subscribed"],
+                recipe["author"]["id"] == self.subscribed.pk,
+            )
+            self.assertEqual(len(recipe["ingredients"]), 3)
+        # The page with flags only, COUNT is cached too
+        self.assertEqual(self.get_page(1), recipes)
+
+    @override_settings(RECIPE_RESPONSE_CACHE=False)
+    def test_authenticated_page_without_cache(self):
+        self.client.force_authenticate(self.user)
+        # COUNT, recipes with flags and authors, ingredients
+        recipes = self.get_page(3)
+        self.assertTrue(recipes[self.favorited.pk]["is_favorited"])
+        self.assertTrue(recipes[self.in_cart.pk]["is_in_shopping_cart"])
+        self.assertEqual(self.get_page(2), recipes)
+
+    def test_cached_page_counts_new_recipes(self):
+        self.assertEqual(self.client.get(PAGE_URL).data["count"], 100)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                author=self.subscribed, name="new", text="text", cooking_time=1
+            )
+        response = self.client.get(PAGE_URL)
+        self.assertEqual(response.data["count"], 101)
+        self.assertIsNotNone(response.data["next"])
+
+
+class RecipeUpdateTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            first_name="Author",
+            last_name="Author",
+            password="password",
+        )
+        cls.ingredient = Ingredient.objects.create(
+            name="salt", measurement_unit="г"
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author,
+            name="recipe",
+            text="text",
+            cooking_time=1,
+            image="recipes/image.png",
+        )
+
+    def test_update_keeps_variants_generated_meanwhile(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        variants = {"source": "recipes/image.png", "small": "small.webp"}
+        Recipe.objects.filter(pk=recipe.pk).update(image_variants=variants)
+        serializer = RecipeWriteSerializer(
+            recipe,
+            data={
+                "name": "renamed",
+                "text": "text",
+                "cooking_time": 2,
+                "ingredients": [{"id": self.ingredient.pk, "amount": 1}],
+            },
+            partial=True,
+        )
+        serializer.is_valid(raise_exception=True)
+        with patch("recipes.signals.schedule_image_variants") as schedule:
+            serializer.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, "renamed")
+        self.assertEqual(recipe.ingredient_ids, [self.ingredient.pk])
+        self.assertEqual(recipe.image_variants, variants)
+        schedule.assert_not_called()
@@ -0,0 +1,54 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.renderers import _register_pdf_font
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    User,
+)
+
+DOWNLOAD_URL = "/api/recipes/download_shopping_cart/"
+
+
+class ShoppingListDownloadTest(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="buyer@example.com",
+            username="buyer",
+            first_name="Buyer",
+            last_name="Buyer",
+            password="password",
+        )
+        recipe = Recipe.objects.create(
+            author=cls.user, name="recipe", text="text", cooking_time=1
+        )
+        RecipeIngredient.objects.create(
+            recipe=recipe,
+            ingredient=Ingredient.objects.create(
+                name="соль", measurement_unit="г"
+            ),
+            amount=5,
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        _register_pdf_font.cache_clear()
+        self.addCleanup(_register_pdf_font.cache_clear)
+
+    def test_text(self):
+        response = self.client.get(DOWNLOAD_URL, {"format": "txt"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            "Соль - 5 г", b"".join(response.streaming_content).decode()
+        )
+
+    @override_settings(SHOPPING_LIST_PDF_FONT="/nonexistent/font.ttf")
+    def test_missing_pdf_font_fails_before_streaming(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(DOWNLOAD_URL, {"format": "pdf"})
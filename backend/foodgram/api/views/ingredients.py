@@ -1,16 +1,56 @@
+from django.conf import settings
+from django.http import Http404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets
 from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
 
+from recipes.catalogue import get_ingredient_catalogue
 from recipes.models import Ingredient
 from api.filters import IngredientFilter
+from api.instrumentation import QueryStatsMixin
+from api.profiling import ProfilingMixin
 from api.serializers.ingredients import IngredientSerializer
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(
+    ProfilingMixin, QueryStatsMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filterset_class = IngredientFilter
     filter_backends = [DjangoFilterBackend]
     permission_classes = [AllowAny]
     pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_CATALOGUE:
+            return super().list(request, *args, **kwargs)
+
+        catalogue = get_ingredient_catalogue()
+        name = request.query_params.get("name")
+        ingredients = (
+            catalogue.search(name, settings.INGREDIENT_SEARCH_LIMIT)
+            if name
+            else catalogue.ingredients
+        )
+        return Response(self.get_serializer(ingredients, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not settings.INGREDIENT_CATALOGUE:
+            return super().retrieve(request, *args, **kwargs)
+
+        try:
+            ingredient = get_ingredient_catalogue().get(int(kwargs["pk"]))
+        except ValueError:
+            raise Http404
+        if ingredient is None:
+            # The snapshot of this process may predate the ingredient
+            return super().retrieve(request, *args, **kwargs)
+        return Response(self.get_serializer(ingredient).data)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == "list" and self.request.query_params.get("name"):
+            return queryset[: settings.INGREDIENT_SEARCH_LIMIT]
+        return queryset
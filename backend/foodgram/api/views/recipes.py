@@ -1,34 +1,100 @@
-from datetime import datetime
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
-from django.http import Http404, FileResponse
+from django.http import Http404, StreamingHttpResponse
 from django.urls import reverse
 from django.shortcuts import get_object_or_404
-from django.db.models import Sum
+from django.db.models import Exists, OuterRef, Prefetch
 from django_filters.rest_framework import DjangoFilterBackend
 
 
-from recipes.models import Recipe, FavoriteRecipe, ShoppingCart
+from recipes.models import (
+    Recipe,
+    RecipeIngredient,
+    FavoriteRecipe,
+    ShoppingCart,
+    Subscription,
+)
+from recipes.response_cache import get_list_version
 from api.serializers.recipes import (
     RecipeReadSerializer,
     RecipeWriteSerializer,
 )
 from api.serializers.users import RecipeShortSerializer
 from api.permissions import IsAuthorOrReadOnly
-from api.pagination import SitePagination
+from api.renderers import (
+    ShoppingListNegotiation,
+    ShoppingListTextRenderer,
+    ShoppingListCSVRenderer,
+    ShoppingListPDFRenderer,
+)
+from api.shopping_list import ShoppingList
+from api.pagination import CachedCountPagination
 from api.filters import RecipeFilter
-
-
-class RecipeViewSet(viewsets.ModelViewSet):
+from api.caching import AnonymousCacheMixin, RecipeFragmentMixin
+from api.instrumentation import QueryStatsMixin
+from api.profiling import ProfilingMixin
+
+
+class RecipeViewSet(
+    ProfilingMixin,
+    QueryStatsMixin,
+    AnonymousCacheMixin,
+    RecipeFragmentMixin,
+    viewsets.ModelViewSet,
+):
     queryset = Recipe.objects.all()
     filter_backends = [DjangoFilterBackend]
-    pagination_class = SitePagination
+    pagination_class = CachedCountPagination
     filterset_class = RecipeFilter
     permission_classes = (IsAuthorOrReadOnly,)
+    cursor_ordering = ("name", "id")
+
+    def get_detailed_queryset(self):
+        return Recipe.objects.select_related("author").prefetch_related(
+            Prefetch(
+                "recipe_ingredients",
+                queryset=RecipeIngredient.objects.select_related(
+                    "ingredient"
+                ),
+            )
+        )
+
+    def get_queryset(self):
+        current_user = self.request.user
+        if not current_user.is_authenticated:
+            return self.get_detailed_queryset()
+
+        if self.action in ("list", "retrieve") and self.use_fragments():
+            # Recipe bodies come from cached fragments, see api.caching
+            recipes = Recipe.objects.only("name", "author")
+        else:
+            recipes = self.get_detailed_queryset()
+
+        return recipes.annotate(
+            is_favorited=Exists(
+                FavoriteRecipe.objects.filter(
+                    user=current_user, recipe=OuterRef("pk")
+                )
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(
+                    user=current_user, recipe=OuterRef("pk")
+                )
+            ),
+            is_author_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=current_user, author=OuterRef("author")
+                )
+            ),
+        )
+
+    def get_count_version(self):
+        # Cached pages must not outlive their counts
+        return get_list_version()
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
@@ -96,54 +162,31 @@ class RecipeViewSet(viewsets.ModelViewSet):
         )
 
     @action(
-        detail=False, permission_classes=[IsAuthenticated], methods=["get"]
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        methods=["get"],
+        renderer_classes=[
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListPDFRenderer,
+        ],
+        content_negotiation_class=ShoppingListNegotiation,
     )
     def download_shopping_cart(self, request):
-        recipes = Recipe.objects.filter(shoppingcarts__user=request.user)
-
-        if not recipes.exists():
+        if not ShoppingCart.objects.filter(user=request.user).exists():
             raise ValidationError({"errors": "Список покупок пуст"})
 
-        ingredients = (
-            recipes.values(
-                "ingredients__name", "ingredients__measurement_unit"
-            )
-            .annotate(total_amount=Sum("recipe_ingredients__amount"))
-            .order_by("ingredients__name")
-        )
+        renderer = request.accepted_renderer
+        renderer.prepare()
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type += f"; charset={renderer.charset}"
 
-        current_date = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-        shopping_list = [
-            "Фудграм - Список покупок",
-            f"Дата: {current_date} UTC",
-            f"Пользователь: {request.user.username}",
-            "",
-            "Ингредиенты:",
-        ]
-
-        for i, ingredient in enumerate(ingredients, 1):
-            shopping_list.append(
-                f"{i}. {ingredient['ingredients__name'].title()} - "
-                f"{ingredient['total_amount']} "
-                f"{ingredient['ingredients__measurement_unit']}"
-            )
-
-        shopping_list.append("")
-        shopping_list.append("Рецепты:")
-
-        for recipe in recipes:
-            shopping_list.append(
-                f"- {recipe.name} (автор: {recipe.author.get_full_name()})"
-            )
-
-        shopping_list.append("")
-        shopping_list.append(
-            f"Фудграм - Ваш кулинарный помощник © {datetime.now().year}"
+        response = StreamingHttpResponse(
+            renderer.stream(ShoppingList(request.user)),
+            content_type=content_type,
         )
-
-        return FileResponse(
-            ("\n".join(shopping_list)),
-            as_attachment=True,
-            filename="shopping_list.txt",
-            content_type="text/plain; charset=utf-8",
+        response["Content-Disposition"] = (
+            f'attachment; filename="shopping_list.{renderer.format}"'
         )
+        return response
@@ -1,4 +1,15 @@
 from djoser.views import UserViewSet as DjoserUserViewSet
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Value,
+    Window,
+)
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import action
@@ -6,22 +17,60 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
 
-from api.pagination import SitePagination
+from api.instrumentation import QueryStatsMixin
+from api.profiling import ProfilingMixin
+from api.pagination import CachedCountPagination
 from api.serializers.users import (
     UserProfileSerializer,
     UserAvatarSerializer,
     UserWithRecipesSerializer,
 )
-from recipes.models import User, Subscription
+from recipes.models import Recipe, User, Subscription
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ProfilingMixin, QueryStatsMixin, DjoserUserViewSet):
     """User viewset"""
 
     queryset = User.objects.all()
-    pagination_class = SitePagination
+    pagination_class = CachedCountPagination
     serializer_class = UserProfileSerializer
     permission_classes = [AllowAny]
+    cursor_ordering = ("username", "id")
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        current_user = self.request.user
+        if current_user.is_authenticated and self.action in (
+            "list",
+            "retrieve",
+        ):
+            queryset = queryset.annotate(
+                is_subscribed=Exists(
+                    Subscription.objects.filter(
+                        user=current_user, author=OuterRef("pk")
+                    )
+                )
+            )
+        return queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["recipes_limit"] = self._get_recipes_limit()
+        return context
+
+    def _get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get("recipes_limit")
+        if recipes_limit is None:
+            return None
+        try:
+            recipes_limit = int(recipes_limit)
+        except ValueError:
+            recipes_limit = 0
+        if recipes_limit < 1:
+            raise ValidationError(
+                {"recipes_limit": "Must be a positive integer."}
+            )
+        return recipes_limit
 
     @action(
         detail=False, methods=["get"], permission_classes=[IsAuthenticated]
@@ -61,13 +110,31 @@ class UserViewSet(DjoserUserViewSet):
         detail=False,
         permission_classes=[IsAuthenticated],
         serializer_class=UserWithRecipesSerializer,
-        pagination_class=SitePagination,
+        pagination_class=CachedCountPagination,
     )
     def subscriptions(self, request):
         """Returns users that current user is subscribed to."""
-        subscribed_users = User.objects.filter(
-            authors__user=request.user
-        ).prefetch_related("recipes")
+        recipes = Recipe.objects.all()
+        recipes_limit = self._get_recipes_limit()
+        if recipes_limit is not None:
+            # Top N recipes per author in a single query.
+            recipes = recipes.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F("author"),
+                    order_by=(F("name").asc(), F("id").asc()),
+                )
+            ).filter(row_number__lte=recipes_limit)
+
+        subscribed_users = (
+            User.objects.filter(authors__user=request.user)
+            .annotate(
+                recipes_count=Count("recipes"),
+                is_subscribed=Value(True, output_field=BooleanField()),
+            )
+            .prefetch_related(Prefetch("recipes", queryset=recipes))
+            .order_by("username")
+        )
 
         paginated_users = self.paginate_queryset(subscribed_users)
         serializer = self.get_serializer(paginated_users, many=True)
@@ -0,0 +1,115 @@
+"""Prometheus metrics of the backend.
+
+With PROMETHEUS_MULTIPROC_DIR set, every gunicorn worker writes its
+values to files in that directory and /metrics aggregates them, see
+gunicorn.conf.py.
+"""
+
+import os
+import time
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+REQUESTS = Counter(
+    "foodgram_http_requests_total",
+    "HTTP requests by route, method and status",
+    ["route", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "foodgram_http_request_duration_seconds",
+    "Time spent on HTTP requests",
+    ["route", "method"],
+)
+DB_DURATION = Histogram(
+    "foodgram_db_duration_seconds",
+    "Time spent on SQL queries per request",
+    ["route"],
+)
+DB_QUERIES = Histogram(
+    "foodgram_db_queries",
+    "Number of SQL queries per request",
+    ["route"],
+    buckets=QUERY_BUCKETS,
+)
+RESPONSE_SIZE = Histogram(
+    "foodgram_http_response_size_bytes",
+    "Size of HTTP response bodies",
+    ["route"],
+    buckets=SIZE_BUCKETS,
+)
+CACHE_REQUESTS = Counter(
+    "foodgram_cache_requests_total",
+    "Cache lookups by cache and result, hit or miss",
+    ["cache", "result"],
+)
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def _counted(content, route):
+    size = 0
+    for chunk in content:
+        size += len(chunk)
+        yield chunk
+    RESPONSE_SIZE.labels(route).observe(size)
+
+
+class MetricsMiddleware:
+    """Observes latency, SQL queries and response size per route.
+
+    Routes are URL names, e.g. recipes-list or recipes-favorite, so the
+    number of label values stays bounded. Database figures come from
+    api.instrumentation.QueryBudgetMiddleware, which must come next.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        route = match.view_name if match else "unmatched"
+        REQUESTS.labels(route, request.method, response.status_code).inc()
+        REQUEST_DURATION.labels(route, request.method).observe(duration)
+
+        stats = getattr(request, "query_stats", None)
+        if stats is not None:
+            DB_DURATION.labels(route).observe(stats.duration)
+            DB_QUERIES.labels(route).observe(stats.count)
+
+        if response.streaming:
+            response.streaming_content = _counted(
+                response.streaming_content, route
+            )
+        else:
+            RESPONSE_SIZE.labels(route).observe(len(response.content))
+        return response
+
+
+def metrics(request):
+    """Metrics in the Prometheus text format."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(
+        generate_latest(registry), content_type=CONTENT_TYPE_LATEST
+    )
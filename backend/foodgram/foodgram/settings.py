@@ -29,6 +29,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "foodgram.metrics.MetricsMiddleware",
+    "api.instrumentation.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -73,6 +75,14 @@ DATABASES = {
     }
 }
 
+# SQLite runs the tests without a database server, search and array
+# lookups fall back to slower queries there
+if os.getenv("DB_ENGINE") == "sqlite3":
+    DATABASES["default"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "db.sqlite3",
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,3 +150,109 @@ DJOSER = {
 }
 
 AUTH_USER_MODEL = "recipes.User"
+
+# Maximum number of ingredients returned by the name search
+INGREDIENT_SEARCH_LIMIT = int(os.getenv("INGREDIENT_SEARCH_LIMIT", 50))
+
+# Counts of paginated lists are cached for a few seconds, large
+# unfiltered tables report the planner estimate instead
+PAGINATION_COUNT_CACHE_TIMEOUT = 10
+PAGINATION_EXACT_COUNT_LIMIT = 100_000
+
+# Limits of base64 encoded image uploads
+IMAGE_UPLOAD_MAX_SIZE = int(os.getenv("IMAGE_UPLOAD_MAX_SIZE", 5 * 1024 * 1024))
+IMAGE_UPLOAD_MAX_DIMENSION = 6000
+IMAGE_UPLOAD_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp")
+
+# Resized WebP copies of recipe images, generated by background threads
+RECIPE_IMAGE_VARIANTS = {
+    "small": (320, 320),
+    "medium": (960, 960),
+}
+IMAGE_VARIANT_QUALITY = 80
+# 0 generates the variants synchronously after the commit
+IMAGE_PIPELINE_WORKERS = int(os.getenv("IMAGE_PIPELINE_WORKERS", 2))
+
+# The cache is shared by gunicorn workers only with a non-local backend,
+# e.g. CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache.
+# Recipe responses and fragments take an entry per page and recipe, and
+# culling them also drops the version keys, so MAX_ENTRIES should exceed
+# the number of recipes by far.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 100_000)),
+        },
+    }
+}
+
+# Caches invalidated by other processes, such as gunicorn workers and
+# management commands, are only enabled by default with a shared cache
+CACHE_IS_SHARED = not CACHES["default"]["BACKEND"].endswith(".LocMemCache")
+
+# Serve ingredients from an in-process snapshot instead of the database,
+# its version lives in the cache
+INGREDIENT_CATALOGUE = bool(
+    int(os.getenv("INGREDIENT_CATALOGUE", CACHE_IS_SHARED))
+)
+
+# Anonymous recipe list and detail responses are cached until a recipe,
+# its ingredients or author change, or for this many seconds
+RECIPE_RESPONSE_CACHE = bool(
+    int(os.getenv("RECIPE_RESPONSE_CACHE", CACHE_IS_SHARED))
+)
+RECIPE_RESPONSE_CACHE_TIMEOUT = int(
+    os.getenv("RECIPE_RESPONSE_CACHE_TIMEOUT", 60 * 60)
+)
+# max-age of their Cache-Control header
+RECIPE_RESPONSE_MAX_AGE = int(os.getenv("RECIPE_RESPONSE_MAX_AGE", 60))
+
+# TrueType font with cyrillic glyphs for PDF shopping lists
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+# Maximum numbers of SQL queries by view name, checked by
+# api.instrumentation.QueryBudgetMiddleware and assert_query_budget
+QUERY_BUDGETS = {
+    # Cold recipe fragments cost the page query once more, see api.caching
+    "recipes-list": 6,
+    "recipes-detail": 4,
+    "recipes-download-shopping-cart": 3,
+    "users-list": 4,
+    "users-detail": 3,
+    "users-me": 2,
+    "users-subscriptions": 4,
+    "ingredients-list": 2,
+    "ingredients-detail": 2,
+}
+QUERY_BUDGET_DEFAULT = None
+QUERY_BUDGET_RAISE = bool(int(os.getenv("QUERY_BUDGET_RAISE", False)))
+SLOW_QUERY_MS = int(os.getenv("SLOW_QUERY_MS", 100))
+# Exposes query counts and timings to clients
+SERVER_TIMING = bool(int(os.getenv("SERVER_TIMING", DEBUG)))
+
+# Share of API requests profiled by api.profiling.ProfilingMixin,
+# staff users can also profile a request with ?_profile=1
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(BASE_DIR, "profiles"))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "foodgram.queries": {
+            "handlers": ["console"],
+            "level": os.getenv("QUERY_LOG_LEVEL", "WARNING"),
+            "propagate": False,
+        },
+    },
+}
@@ -1,7 +1,13 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.safestring import mark_safe
 from django.contrib.auth.admin import UserAdmin
 
+from .cooking_time import get_cooking_time_buckets
 from .models import (
     User,
     Subscription,
@@ -10,15 +16,90 @@ from .models import (
     RecipeIngredient,
     FavoriteRecipe,
     ShoppingCart,
+    ShoppingCartTotal,
 )
 
 
+def count_related(model, field):
+    """Subquery counting rows of model that refer to the outer row"""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
 class RecipesCountMixin:
-    """Mixin providing recipes count functionality"""
+    """Mixin providing recipes count functionality
+
+    The admin annotates recipes_count in get_queryset.
+    """
 
-    @admin.display(description="рецепты")
+    @admin.display(description="рецепты", ordering="recipes_count")
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """Filter by a foreign key chosen with the admin autocomplete widget
+
+    Unlike the default filter it does not render every related object,
+    the admin of the related model must define search_fields.
+    """
+
+    template = "admin/recipes/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f"{field_path}__{field.target_field.name}__exact"
+        super().__init__(
+            field, request, params, model, model_admin, field_path
+        )
+        self.lookup_val = request.GET.get(self.lookup_kwarg)
+        self.hidden_params = [
+            (name, value)
+            for name, values in request.GET.lists()
+            if name not in (self.lookup_kwarg, PAGE_VAR)
+            for value in values
+        ]
+        choice_field = forms.ModelChoiceField(
+            queryset=field.related_model._default_manager.all(),
+            widget=AutocompleteSelect(field, model_admin.admin_site),
+            required=False,
+        )
+        self.widget = choice_field.widget.render(
+            self.lookup_kwarg,
+            self.lookup_val,
+            attrs={"id": f"id_filter_{field_path}", "style": "width: 100%"},
+        )
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def choices(self, changelist):
+        yield {
+            "selected": self.lookup_val is None,
+            "query_string": changelist.get_query_string(
+                remove=[self.lookup_kwarg]
+            ),
+            "display": "Все",
+        }
+
+
+class AutocompleteFilterMixin:
+    """Adds scripts of AutocompleteFilter to the changelist"""
+
+    @property
+    def media(self):
+        return (
+            super().media
+            + AutocompleteSelect(None, self.admin_site).media
+            + forms.Media(js=("recipes/js/autocomplete_filter.js",))
+        )
 
 
 class BaseHasFilter(admin.SimpleListFilter):
@@ -31,18 +112,22 @@ class BaseHasFilter(admin.SimpleListFilter):
         return self.lookups_choices
 
     def queryset(self, request, queryset):
+        related = Exists(
+            self.related_model.objects.filter(
+                **{self.related_field: OuterRef("pk")}
+            )
+        )
         if self.value() == "yes":
-            return queryset.filter(
-                **{f"{self.field}__isnull": False}
-            ).distinct()
+            return queryset.filter(related)
         if self.value() == "no":
-            return queryset.filter(**{f"{self.field}__isnull": True})
+            return queryset.filter(~related)
 
 
 class HasRecipesFilter(BaseHasFilter):
     title = "наличие рецептов"
     parameter_name = "has_recipes"
-    field = "recipes"
+    related_model = Recipe
+    related_field = "author"
     lookups_choices = (
         ("yes", "Есть рецепты"),
         ("no", "Нет рецептов"),
@@ -52,7 +137,8 @@ class HasRecipesFilter(BaseHasFilter):
 class HasFollowersFilter(BaseHasFilter):
     title = "наличие подписчиков"
     parameter_name = "has_followers"
-    field = "authors"
+    related_model = Subscription
+    related_field = "author"
     lookups_choices = (
         ("yes", "Есть подписчики"),
         ("no", "Нет подписчиков"),
@@ -62,7 +148,8 @@ class HasFollowersFilter(BaseHasFilter):
 class HasSubscriptionsFilter(BaseHasFilter):
     title = "наличие подписок"
     parameter_name = "has_subscriptions"
-    field = "followers"
+    related_model = Subscription
+    related_field = "user"
     lookups_choices = (
         ("yes", "Есть подписки"),
         ("no", "Нет подписок"),
@@ -141,21 +228,36 @@ class SiteUserAdmin(UserAdmin, RecipesCountMixin):
             return f'<img src="{obj.avatar.url}" width="50" height="50" />'
         return ""
 
-    @admin.display(description="подписчики")
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                recipes_count=count_related(Recipe, "author"),
+                followers_count=count_related(Subscription, "author"),
+                following_count=count_related(Subscription, "user"),
+            )
+        )
+
+    @admin.display(description="подписчики", ordering="followers_count")
     def get_number_of_followers(self, user_obj):
-        return user_obj.authors.count()
+        return user_obj.followers_count
 
-    @admin.display(description="подписки")
+    @admin.display(description="подписки", ordering="following_count")
     def get_number_of_following(self, user_obj):
-        return user_obj.followers.count()
+        return user_obj.following_count
 
 
 @admin.register(Subscription)
-class SubscriptionAdmin(admin.ModelAdmin):
+class SubscriptionAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Subscription admin class"""
 
     list_display = ("id", "author", "user")
-    list_filter = ("author", "user")
+    list_filter = (
+        ("author", AutocompleteFilter),
+        ("user", AutocompleteFilter),
+    )
+    autocomplete_fields = ("author", "user")
     search_fields = ("author__username", "user__username")
 
 
@@ -167,36 +269,21 @@ class CookingTimeFilter(admin.SimpleListFilter):
     _thresholds = None
 
     def lookups(self, request, model_admin):
-        cooking_times = [r.cooking_time for r in Recipe.objects.all()]
-        if not cooking_times:
-            return []
-
-        min_time = min(cooking_times)
-        max_time = max(cooking_times)
-
-        if max_time - min_time <= 5:
+        buckets = get_cooking_time_buckets()
+        if buckets is None:
             return []
 
-        time_range = max_time - min_time
-        self._thresholds = (
-            min_time + time_range // 3,
-            min_time + (2 * time_range) // 3,
-        )
+        self._thresholds = buckets["thresholds"]
         threshold1, threshold2 = self._thresholds
-
-        quick = medium = long = 0
-        for t in cooking_times:
-            if t < threshold1:
-                quick += 1
-            elif t < threshold2:
-                medium += 1
-            else:
-                long += 1
+        counts = buckets["counts"]
 
         return [
-            ("quick", f"до {threshold1} мин ({quick})"),
-            ("medium", f"от {threshold1} до {threshold2} мин ({medium})"),
-            ("long", f"от {threshold2} мин и больше ({long})"),
+            ("quick", f"до {threshold1} мин ({counts['quick']})"),
+            (
+                "medium",
+                f"от {threshold1} до {threshold2} мин ({counts['medium']})",
+            ),
+            ("long", f"от {threshold2} мин и больше ({counts['long']})"),
         ]
 
     def queryset(self, request, queryset):
@@ -219,10 +306,11 @@ class CookingTimeFilter(admin.SimpleListFilter):
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     extra = 1
+    autocomplete_fields = ("ingredient",)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Recipe admin model"""
 
     list_display = (
@@ -240,12 +328,45 @@ class RecipeAdmin(admin.ModelAdmin):
         "author__first_name",
         "author__last_name",
     )
-    list_filter = (CookingTimeFilter, "author")
+    list_filter = (CookingTimeFilter, ("author", AutocompleteFilter))
+    autocomplete_fields = ("author",)
     inlines = (RecipeIngredientInline,)
 
-    @admin.display(description="в избранном")
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(favorites_count=count_related(FavoriteRecipe, "recipe"))
+            .prefetch_related(
+                Prefetch(
+                    "recipe_ingredients",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )
+        )
+
+    def save_related(self, request, form, formsets, change):
+        recipe = form.instance
+        amounts = recipe.get_ingredient_amounts() if change else {}
+        super().save_related(request, form, formsets, change)
+        recipe.update_ingredient_ids()
+
+        # Inline edits change the totals of carts with the recipe
+        new_amounts = recipe.get_ingredient_amounts()
+        ShoppingCartTotal.objects.apply_changes(
+            recipe.shoppingcarts.values_list("user", flat=True),
+            {
+                ingredient_id: new_amounts.get(ingredient_id, 0)
+                - amounts.get(ingredient_id, 0)
+                for ingredient_id in amounts.keys() | new_amounts.keys()
+            },
+        )
+
+    @admin.display(description="в избранном", ordering="favorites_count")
     def get_favorites_count(self, obj):
-        return obj.favoriterecipes.count()
+        return obj.favorites_count
 
     @admin.display(description="ингредиенты")
     @mark_safe
@@ -275,11 +396,24 @@ class IngredientAdmin(admin.ModelAdmin, RecipesCountMixin):
     search_fields = ("name", "measurement_unit")
     list_filter = ("measurement_unit",)
 
+    def get_queryset(self, request):
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                recipes_count=count_related(RecipeIngredient, "ingredient")
+            )
+        )
+
 
 @admin.register(FavoriteRecipe, ShoppingCart)
-class UserRecipeRelationAdmin(admin.ModelAdmin):
+class UserRecipeRelationAdmin(AutocompleteFilterMixin, admin.ModelAdmin):
     """Admin model for user-recipe relations"""
 
     list_display = ("user", "recipe")
     search_fields = ("user__username", "recipe__name")
-    list_filter = ("user", "recipe")
+    list_filter = (
+        ("user", AutocompleteFilter),
+        ("recipe", AutocompleteFilter),
+    )
+    autocomplete_fields = ("user", "recipe")
@@ -0,0 +1,69 @@
+"""Recipe archives written by export_recipes and read by import_recipes.
+
+A JSONL archive holds one recipe per line with the image embedded as
+a data URI. A tar archive holds each recipe as a JSON member in
+recipes/ right after its image in images/, which the record references
+by path, so a compressed archive can be read once in order.
+"""
+
+import base64
+import mimetypes
+from pathlib import PurePosixPath
+
+RECIPES_DIR = "recipes"
+IMAGES_DIR = "images"
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz")
+
+
+def get_archive_format(path, archive_format=None):
+    if archive_format:
+        return archive_format
+    return "tar" if str(path).endswith(TAR_SUFFIXES) else "jsonl"
+
+
+def get_record_member(recipe):
+    return f"{RECIPES_DIR}/{recipe.pk}.json"
+
+
+def get_image_member(recipe):
+    return f"{IMAGES_DIR}/{recipe.pk}_{PurePosixPath(recipe.image.name).name}"
+
+
+def encode_image(name, content):
+    mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+    return f"data:{mime_type};base64,{base64.b64encode(content).decode()}"
+
+
+def decode_image(value):
+    """Returns file name and content of a data URI."""
+    header, data = value.split(";base64,", 1)
+    extension = mimetypes.guess_extension(header.removeprefix("data:"))
+    return f"image{extension or ''}", base64.b64decode(data)
+
+
+def recipe_to_record(recipe, image):
+    """Returns the archive record of a recipe.
+
+    recipe_ingredients must be prefetched with their ingredients.
+    """
+    author = recipe.author
+    return {
+        "name": recipe.name,
+        "text": recipe.text,
+        "cooking_time": recipe.cooking_time,
+        "image": image,
+        "author": {
+            "email": author.email,
+            "username": author.username,
+            "first_name": author.first_name,
+            "last_name": author.last_name,
+        },
+        "ingredients": [
+            {
+                "name": item.ingredient.name,
+                "measurement_unit": item.ingredient.measurement_unit,
+                "amount": item.amount,
+            }
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
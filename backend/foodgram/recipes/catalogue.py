@@ -0,0 +1,128 @@
+import threading
+import time
+from bisect import bisect_left
+from types import MappingProxyType
+
+from django.core.cache import cache
+from django.db import transaction
+
+from foodgram.metrics import record_cache
+
+from .models import Ingredient
+
+VERSION_CACHE_KEY = "ingredient_catalogue_version"
+
+# Shorter name queries only match the beginning of names,
+# they cannot use the trigram index either.
+CONTAINS_MIN_LENGTH = 3
+
+
+class IngredientCatalogue:
+    """Immutable in-memory snapshot of all ingredients.
+
+    Ingredients are looked up by id with a dict and searched by name
+    prefix with bisect over upper-cased names.
+    """
+
+    def __init__(self, ingredients, version):
+        self.version = version
+        self.ingredients = tuple(ingredients)
+        self._by_id = MappingProxyType(
+            {ingredient.pk: ingredient for ingredient in self.ingredients}
+        )
+        index = sorted(
+            (ingredient.name.upper(), position)
+            for position, ingredient in enumerate(self.ingredients)
+        )
+        self._keys = tuple(key for key, _ in index)
+        self._positions = tuple(position for _, position in index)
+
+    def __len__(self):
+        return len(self.ingredients)
+
+    def get(self, pk):
+        return self._by_id.get(pk)
+
+    def search(self, value, limit=None):
+        """Returns names starting with value, then names containing it."""
+        value = value.upper()
+        found = []
+        position = bisect_left(self._keys, value)
+        while (
+            position < len(self._keys)
+            and self._keys[position].startswith(value)
+        ):
+            found.append(self._positions[position])
+            position += 1
+
+        if len(value) >= CONTAINS_MIN_LENGTH:
+            prefixed = set(found)
+            found.extend(
+                sorted(
+                    position
+                    for key, position in zip(self._keys, self._positions)
+                    if value in key and position not in prefixed
+                )
+            )
+
+        return [self.ingredients[position] for position in found[:limit]]
+
+
+_catalogue = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_version():
+    # Starts from the current time, so a version lost with the cache
+    # can never match a snapshot built before.
+    return cache.get_or_set(VERSION_CACHE_KEY, time.time_ns, timeout=None)
+
+
+def _bump_version():
+    try:
+        cache.incr(VERSION_CACHE_KEY)
+    except ValueError:
+        cache.set(VERSION_CACHE_KEY, time.time_ns(), timeout=None)
+
+
+def invalidate_ingredient_catalogue():
+    """Bumps the version, all processes rebuild their snapshots.
+
+    Runs after the commit, so a snapshot built from the old rows
+    cannot get the new version.
+    """
+    transaction.on_commit(_bump_version)
+
+
+def get_ingredient_catalogue():
+    """Returns the snapshot of the current version, building it if stale."""
+    global _catalogue
+
+    version = get_version()
+    catalogue = _catalogue
+    if catalogue is not None and catalogue.version == version:
+        _stats["hits"] += 1
+        record_cache("ingredient_catalogue", True)
+        return catalogue
+
+    with _lock:
+        if _catalogue is None or _catalogue.version != version:
+            _stats["misses"] += 1
+            record_cache("ingredient_catalogue", False)
+            _catalogue = IngredientCatalogue(
+                Ingredient.objects.all(), version
+            )
+        else:
+            _stats["hits"] += 1
+            record_cache("ingredient_catalogue", True)
+        return _catalogue
+
+
+def ingredient_catalogue_stats():
+    catalogue = _catalogue
+    return {
+        **_stats,
+        "version": catalogue.version if catalogue else None,
+        "size": len(catalogue) if catalogue else 0,
+    }
@@ -0,0 +1,53 @@
+from django.core.cache import cache
+from django.db.models import Count, Max, Min, Q
+
+from foodgram.metrics import record_cache
+
+from .models import Recipe
+
+CACHE_KEY = "recipe_cooking_time_buckets"
+
+# Closer times are not split into buckets
+MIN_TIME_RANGE = 5
+
+_MISSING = object()
+
+
+def _count_buckets():
+    bounds = Recipe.objects.aggregate(
+        min_time=Min("cooking_time"), max_time=Max("cooking_time")
+    )
+    min_time, max_time = bounds["min_time"], bounds["max_time"]
+    if min_time is None or max_time - min_time <= MIN_TIME_RANGE:
+        return None
+
+    time_range = max_time - min_time
+    threshold1 = min_time + time_range // 3
+    threshold2 = min_time + (2 * time_range) // 3
+    counts = Recipe.objects.aggregate(
+        quick=Count("pk", filter=Q(cooking_time__lte=threshold1)),
+        medium=Count(
+            "pk",
+            filter=Q(cooking_time__gt=threshold1, cooking_time__lte=threshold2),
+        ),
+        long=Count("pk", filter=Q(cooking_time__gt=threshold2)),
+    )
+    return {"thresholds": (threshold1, threshold2), "counts": counts}
+
+
+def get_cooking_time_buckets():
+    """Returns thresholds and recipe counts of the cooking time buckets.
+
+    The histogram is cached until a recipe is saved or deleted.
+    None means the cooking times are too close to be split.
+    """
+    buckets = cache.get(CACHE_KEY, _MISSING)
+    record_cache("cooking_time_buckets", buckets is not _MISSING)
+    if buckets is _MISSING:
+        buckets = _count_buckets()
+        cache.set(CACHE_KEY, buckets, timeout=None)
+    return buckets
+
+
+def invalidate_cooking_time_buckets():
+    cache.delete(CACHE_KEY)
@@ -0,0 +1,37 @@
+import json
+
+from django.contrib.postgres.fields import ArrayField
+
+
+class PortableArrayField(ArrayField):
+    """ArrayField stored as JSON text on databases other than PostgreSQL.
+
+    Array lookups such as contains and overlap only work on PostgreSQL,
+    other databases can only read and write the whole value.
+    """
+
+    def db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return super().db_type(connection)
+        return "text"
+
+    def cast_db_type(self, connection):
+        if connection.vendor == "postgresql":
+            return super().cast_db_type(connection)
+        return "text"
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor == "postgresql":
+            return super().get_placeholder(value, compiler, connection)
+        return "%s"
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        if connection.vendor == "postgresql" or value is None:
+            return value
+        return json.dumps(value)
+
+    def from_db_value(self, value, expression, connection):
+        if isinstance(value, str):
+            return json.loads(value)
+        return value
@@ -0,0 +1,108 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image
+
+from .models import Recipe
+from .response_cache import invalidate_recipe_responses
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PIPELINE_WORKERS,
+            thread_name_prefix="image-pipeline",
+        )
+    return _executor
+
+
+def variants_are_current(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get("source") == recipe.image.name
+    )
+
+
+def _render_variant(image, size):
+    variant = image.copy()
+    variant.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, "WEBP", quality=settings.IMAGE_VARIANT_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_image_variants(recipe_id, source):
+    """Saves resized WebP copies of the recipe image.
+
+    The variants are stored on the recipe only if its image is still
+    ``source``, files of replaced variants are deleted.
+    """
+    stem = PurePosixPath(source).stem
+    with default_storage.open(source) as file, Image.open(file) as image:
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+        variants = {"source": source}
+        for name, size in settings.RECIPE_IMAGE_VARIANTS.items():
+            variants[name] = default_storage.save(
+                f"recipes/variants/{stem}_{name}.webp",
+                ContentFile(_render_variant(image, size)),
+            )
+
+    with transaction.atomic():
+        recipe = (
+            Recipe.objects.select_for_update()
+            .only("image", "image_variants")
+            .filter(pk=recipe_id, image=source)
+            .first()
+        )
+        if recipe is None:
+            stale = variants
+        else:
+            stale = recipe.image_variants
+            Recipe.objects.filter(pk=recipe_id).update(
+                image_variants=variants
+            )
+            invalidate_recipe_responses([recipe_id])
+
+    for name in settings.RECIPE_IMAGE_VARIANTS:
+        if stale.get(name):
+            default_storage.delete(stale[name])
+
+
+def _run(recipe_id, source, in_worker=False):
+    try:
+        generate_image_variants(recipe_id, source)
+    except Exception:
+        logger.exception(
+            "Cannot generate variants of %s for recipe %s", source, recipe_id
+        )
+    finally:
+        if in_worker:
+            connection.close()
+
+
+def schedule_image_variants(recipe):
+    """Generates image variants in the background after commit.
+
+    With IMAGE_PIPELINE_WORKERS = 0 the variants are generated right
+    after the commit in the current thread.
+    """
+    if not recipe.image or variants_are_current(recipe):
+        return
+
+    args = (recipe.pk, recipe.image.name)
+    if settings.IMAGE_PIPELINE_WORKERS:
+        transaction.on_commit(
+            lambda: _get_executor().submit(_run, *args, in_worker=True)
+        )
+    else:
+        transaction.on_commit(lambda: _run(*args))
@@ -0,0 +1,200 @@
+import json
+import platform
+import statistics
+import time
+from itertools import cycle
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from recipes.models import Ingredient, User
+
+from .seed_bench import EMAIL_DOMAIN, INGREDIENT_PREFIX
+
+PERCENTILES = (50, 95, 99)
+
+
+class InProcessTarget:
+    """Calls the API through the Django test client, counting queries."""
+
+    def __init__(self, token):
+        self.client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                content = b"".join(response.streaming_content)
+            else:
+                content = response.content
+        return response.status_code, len(content), len(queries)
+
+
+class HttpTarget:
+    """Calls a running server, e.g. gunicorn, over HTTP."""
+
+    def __init__(self, token, base_url):
+        self.base_url = base_url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Token {token}"
+
+    def get(self, url):
+        response = self.session.get(self.base_url + url)
+        return response.status_code, len(response.content), None
+
+
+class Command(BaseCommand):
+    help = "Measure API latency on data generated by seed_bench"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=200,
+            help="Number of measured requests per endpoint",
+        )
+        parser.add_argument(
+            "--warmup",
+            type=int,
+            default=10,
+            help="Number of requests per endpoint made before measuring",
+        )
+        parser.add_argument(
+            "--user",
+            default=f"user0@{EMAIL_DOMAIN}",
+            help="Email of the user making the requests",
+        )
+        parser.add_argument(
+            "--base-url",
+            help=(
+                "URL of a running server, requests go through "
+                "the Django test client by default"
+            ),
+        )
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            help="Name of an endpoint to measure, all by default",
+        )
+        parser.add_argument("--output", help="Path to save JSON results")
+        parser.add_argument(
+            "--compare", help="Path to earlier JSON results to compare with"
+        )
+
+    def _get_endpoints(self):
+        prefixes = [
+            name.removeprefix(INGREDIENT_PREFIX)[:3]
+            for name in Ingredient.objects.filter(
+                name__startswith=INGREDIENT_PREFIX
+            ).values_list("name", flat=True)[:20]
+        ] or ["а", "мо", "сол"]
+        return {
+            "recipes": (
+                f"/api/recipes/?page={page}&limit=6" for page in range(1, 21)
+            ),
+            "subscriptions": ["/api/users/subscriptions/?recipes_limit=3"],
+            "ingredients": (
+                f"/api/ingredients/?name={prefix}" for prefix in prefixes
+            ),
+            "download_shopping_cart": ["/api/recipes/download_shopping_cart/"],
+        }
+
+    def _measure(self, target, urls, warmup, count):
+        urls = cycle(list(urls))
+        for _ in range(warmup):
+            target.get(next(urls))
+
+        latencies, sizes, queries, errors = [], [], [], 0
+        for _ in range(count):
+            started = time.perf_counter()
+            status, size, query_count = target.get(next(urls))
+            latencies.append((time.perf_counter() - started) * 1000)
+            sizes.append(size)
+            if query_count is not None:
+                queries.append(query_count)
+            if status >= 400:
+                errors += 1
+
+        quantiles = statistics.quantiles(latencies, n=100, method="inclusive")
+        return {
+            "requests": count,
+            "errors": errors,
+            **{
+                f"p{percentile}_ms": round(quantiles[percentile - 1], 2)
+                for percentile in PERCENTILES
+            },
+            "mean_ms": round(statistics.fmean(latencies), 2),
+            "bytes": round(statistics.fmean(sizes)),
+            "queries": (
+                round(statistics.fmean(queries), 2) if queries else None
+            ),
+        }
+
+    def _write_comparison(self, results, path):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)["endpoints"]
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            changes = ", ".join(
+                f"{key} {previous[name][key]} -> {result[key]}"
+                for key in ("p50_ms", "p95_ms", "queries", "bytes")
+                if previous[name][key] != result[key]
+            )
+            self.stdout.write(f"{name}: {changes or 'no changes'}")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 2:
+            raise CommandError("--requests must be at least 2")
+        user = User.objects.filter(email=options["user"]).first()
+        if user is None:
+            raise CommandError(
+                f"User {options['user']} not found, run seed_bench first"
+            )
+        token = Token.objects.get_or_create(user=user)[0].key
+
+        endpoints = self._get_endpoints()
+        selected = options["endpoint"] or list(endpoints)
+        unknown = set(selected) - endpoints.keys()
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(unknown)}")
+
+        if options["base_url"]:
+            target = HttpTarget(token, options["base_url"])
+            hosts = settings.ALLOWED_HOSTS
+        else:
+            target = InProcessTarget(token)
+            hosts = [*settings.ALLOWED_HOSTS, "testserver"]
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=hosts):
+            for name in selected:
+                results[name] = self._measure(
+                    target,
+                    endpoints[name],
+                    options["warmup"],
+                    options["requests"],
+                )
+                self.stdout.write(f"{name}: {json.dumps(results[name])}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(
+                    {
+                        "created_at": timezone.now().isoformat(),
+                        "target": options["base_url"] or "test client",
+                        "database": connection.vendor,
+                        "python": platform.python_version(),
+                        "endpoints": results,
+                    },
+                    file,
+                    indent=2,
+                )
+        if options["compare"]:
+            self._write_comparison(results, options["compare"])
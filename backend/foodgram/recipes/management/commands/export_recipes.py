@@ -0,0 +1,107 @@
+import json
+import tarfile
+import time
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db.models import Prefetch
+
+from recipes.archive import (
+    encode_image,
+    get_archive_format,
+    get_image_member,
+    get_record_member,
+    recipe_to_record,
+)
+from recipes.models import Recipe, RecipeIngredient
+
+
+class Command(BaseCommand):
+    help = "Export recipes with authors, ingredients and images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "output_path", type=str, help="Path to JSONL or tar archive"
+        )
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "tar"],
+            help="Archive format, detected by the extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of recipes read from the database at once",
+        )
+
+    def _get_recipes(self, batch_size):
+        return (
+            Recipe.objects.select_related("author")
+            .prefetch_related(
+                Prefetch(
+                    "recipe_ingredients",
+                    queryset=RecipeIngredient.objects.select_related(
+                        "ingredient"
+                    ),
+                )
+            )
+            .order_by("id")
+            .iterator(chunk_size=batch_size)
+        )
+
+    def _write_line(self, file, record):
+        file.write(json.dumps(record, ensure_ascii=False).encode() + b"\n")
+
+    def _export_jsonl(self, output_path, recipes):
+        exported = 0
+        with open(output_path, "wb") as file:
+            for recipe in recipes:
+                image = None
+                if recipe.image:
+                    with default_storage.open(recipe.image.name) as content:
+                        image = encode_image(recipe.image.name, content.read())
+                self._write_line(file, recipe_to_record(recipe, image))
+                exported += 1
+        return exported
+
+    def _export_tar(self, output_path, recipes):
+        """Adds each recipe right after its image."""
+        exported = 0
+        mode = "w" if output_path.endswith(".tar") else "w:gz"
+        with tarfile.open(output_path, mode) as archive:
+            for recipe in recipes:
+                image = None
+                if recipe.image:
+                    image = get_image_member(recipe)
+                    with default_storage.open(recipe.image.name) as content:
+                        member = tarfile.TarInfo(image)
+                        member.size = content.size
+                        archive.addfile(member, content)
+                record = json.dumps(
+                    recipe_to_record(recipe, image), ensure_ascii=False
+                ).encode()
+                member = tarfile.TarInfo(get_record_member(recipe))
+                member.size = len(record)
+                archive.addfile(member, BytesIO(record))
+                exported += 1
+        return exported
+
+    def handle(self, *args, **options):
+        output_path = options["output_path"]
+        recipes = self._get_recipes(options["batch_size"])
+
+        started = time.monotonic()
+        if get_archive_format(output_path, options["format"]) == "tar":
+            exported = self._export_tar(output_path, recipes)
+        else:
+            exported = self._export_jsonl(output_path, recipes)
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {exported} recipes in {elapsed:.2f}s "
+                f"({exported / elapsed:.0f} recipes/s)"
+            )
+        )
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import generate_image_variants, variants_are_current
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Generate missing resized copies of recipe images"
+
+    def handle(self, *args, **options):
+        generated = 0
+        for recipe in (
+            Recipe.objects.exclude(image="")
+            .only("image", "image_variants")
+            .iterator()
+        ):
+            if variants_are_current(recipe):
+                continue
+            try:
+                generate_image_variants(recipe.pk, recipe.image.name)
+            except Exception as e:
+                self.stdout.write(
+                    self.style.ERROR(f"Recipe {recipe.pk}: {str(e)}")
+                )
+                continue
+            generated += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated variants for {generated} recipes")
+        )
@@ -0,0 +1,224 @@
+import json
+import tarfile
+import time
+from itertools import islice
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.archive import (
+    IMAGES_DIR,
+    RECIPES_DIR,
+    decode_image,
+    get_archive_format,
+)
+from recipes.catalogue import invalidate_ingredient_catalogue
+from recipes.cooking_time import invalidate_cooking_time_buckets
+from recipes.response_cache import invalidate_recipe_responses
+from recipes.models import Ingredient, Recipe, RecipeIngredient, User
+
+
+class Command(BaseCommand):
+    help = "Import recipes exported with export_recipes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "input_path", type=str, help="Path to JSONL or tar archive"
+        )
+        parser.add_argument(
+            "--format",
+            choices=["jsonl", "tar"],
+            help="Archive format, detected by the extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of recipes written at once",
+        )
+
+    def _resolve_authors(self, records):
+        """Returns user ids by email, creating missing users."""
+        authors = {
+            record["author"]["email"]: record["author"] for record in records
+        }
+        found = dict(
+            User.objects.filter(email__in=authors).values_list("email", "id")
+        )
+        missing = [
+            User(**author)
+            for email, author in authors.items()
+            if email not in found
+        ]
+        if missing:
+            for user in missing:
+                user.set_unusable_password()
+            User.objects.bulk_create(missing, ignore_conflicts=True)
+            found = dict(
+                User.objects.filter(email__in=authors).values_list(
+                    "email", "id"
+                )
+            )
+        not_created = authors.keys() - found.keys()
+        if not_created:
+            raise CommandError(
+                f"Cannot create authors {', '.join(sorted(not_created))}, "
+                "their usernames are taken"
+            )
+        return found
+
+    def _resolve_ingredients(self, records):
+        """Returns ingredient ids by (name, measurement_unit).
+
+        Missing ingredients are created, the unique_ingredient constraint
+        makes concurrent imports safe.
+        """
+        keys = {
+            (item["name"], item["measurement_unit"])
+            for record in records
+            for item in record["ingredients"]
+        }
+        names = {name for name, _ in keys}
+
+        def find():
+            return {
+                (name, measurement_unit): pk
+                for pk, name, measurement_unit in Ingredient.objects.filter(
+                    name__in=names
+                ).values_list("id", "name", "measurement_unit")
+                if (name, measurement_unit) in keys
+            }
+
+        found = find()
+        if len(found) < len(keys):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in keys - found.keys()
+                ],
+                ignore_conflicts=True,
+            )
+            found = find()
+            self.created_ingredients = True
+        return found
+
+    def _store_image(self, name, content):
+        """Saves an image, deleted unless its recipe is imported."""
+        name = default_storage.save(f"recipes/{name}", ContentFile(content))
+        self.pending_images.append(name)
+        return name
+
+    def _read_jsonl(self, lines):
+        """Yields records with their images stored."""
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record["image"]:
+                record["image"] = self._store_image(
+                    *decode_image(record["image"])
+                )
+            yield record
+
+    def _read_tar(self, archive):
+        """Yields records with their images stored.
+
+        Images precede their records, so the archive is read once in
+        order, which keeps compressed archives from being decompressed
+        again for each image.
+        """
+        images = {}
+        for member in archive:
+            if not member.isfile():
+                continue
+            path = PurePosixPath(member.name)
+            content = archive.extractfile(member).read()
+            if path.parent.name == IMAGES_DIR:
+                images[member.name] = self._store_image(path.name, content)
+            elif path.parent.name == RECIPES_DIR:
+                record = json.loads(content)
+                if record["image"]:
+                    record["image"] = images.pop(record["image"])
+                yield record
+
+    def _import_batch(self, records):
+        with transaction.atomic():
+            authors = self._resolve_authors(records)
+            ingredients = self._resolve_ingredients(records)
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author_id=authors[record["author"]["email"]],
+                    name=record["name"],
+                    text=record["text"],
+                    cooking_time=record["cooking_time"],
+                    image=record["image"] or "",
+                    ingredient_ids=sorted(
+                        ingredients[(item["name"], item["measurement_unit"])]
+                        for item in record["ingredients"]
+                    ),
+                )
+                for record in records
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredients[
+                        (item["name"], item["measurement_unit"])
+                    ],
+                    amount=item["amount"],
+                )
+                for recipe, record in zip(recipes, records)
+                for item in record["ingredients"]
+            )
+        # Images of the next record are stored only when it is read
+        self.pending_images.clear()
+
+    def _import(self, records, batch_size):
+        imported = 0
+        while batch := list(islice(records, batch_size)):
+            self._import_batch(batch)
+            imported += len(batch)
+            self.stdout.write(f"Imported {imported} recipes")
+        return imported
+
+    def handle(self, *args, **options):
+        input_path = options["input_path"]
+        batch_size = options["batch_size"]
+        self.created_ingredients = False
+        self.pending_images = []
+
+        started = time.monotonic()
+        try:
+            if get_archive_format(input_path, options["format"]) == "tar":
+                with tarfile.open(input_path) as archive:
+                    imported = self._import(
+                        self._read_tar(archive), batch_size
+                    )
+            else:
+                with open(input_path, encoding="utf-8") as lines:
+                    imported = self._import(
+                        self._read_jsonl(lines), batch_size
+                    )
+        except (OSError, KeyError, ValueError, tarfile.TarError) as e:
+            raise CommandError(f"Cannot import {input_path}: {e}")
+        finally:
+            # Images of failed batches and of unused tar members
+            for name in self.pending_images:
+                default_storage.delete(name)
+            # bulk_create does not send signals
+            if self.created_ingredients:
+                invalidate_ingredient_catalogue()
+            invalidate_cooking_time_buckets()
+            invalidate_recipe_responses()
+        elapsed = max(time.monotonic() - started, 1e-6)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {imported} recipes in {elapsed:.2f}s "
+                f"({imported / elapsed:.0f} recipes/s). "
+                "Run generate_image_variants to resize their images."
+            )
+        )
@@ -1,43 +1,214 @@
+import csv
+import io
 import json
+import time
+from itertools import islice
+from pathlib import Path
 
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, transaction
 
+from recipes.catalogue import invalidate_ingredient_catalogue
 from recipes.models import Ingredient
 
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file, chunk_size=CHUNK_SIZE):
+    """Yields items of a top-level JSON array without reading it whole."""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+    state = "start"
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise json.JSONDecodeError(
+                    "Unexpected end of data", buffer, position
+                )
+            chunk = file.read(chunk_size)
+            buffer, position, eof = buffer[position:] + chunk, 0, not chunk
+            continue
+
+        char = buffer[position]
+        if state == "start":
+            if char != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, position)
+            position += 1
+            state = "first"
+        elif state == "separator" or (state == "first" and char == "]"):
+            if char == "]":
+                return
+            if char != ",":
+                raise json.JSONDecodeError(
+                    "Expecting ',' delimiter", buffer, position
+                )
+            position += 1
+            state = "value"
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = len(buffer)
+            # A value touching the end of the buffer may continue
+            # in the next chunk
+            if end == len(buffer) and not eof:
+                chunk = file.read(chunk_size)
+                buffer, position = buffer[position:] + chunk, 0
+                eof = not chunk
+                continue
+            yield item
+            position = end
+            state = "separator"
+
 
 class Command(BaseCommand):
-    help = "Load ingredients from JSON file"
+    help = "Load ingredients from JSON or CSV file"
 
     def add_arguments(self, parser):
-        parser.add_argument("file_path", type=str, help="Path to JSON file")
+        parser.add_argument(
+            "file_path", type=str, help="Path to JSON or CSV file"
+        )
+        parser.add_argument(
+            "--format",
+            choices=["json", "csv"],
+            help="File format, detected by the extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of ingredients read and written at once",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help=(
+                "Load through COPY into a staging table and "
+                "INSERT ... ON CONFLICT (PostgreSQL only)"
+            ),
+        )
+
+    def _read_rows(self, file, file_format):
+        if file_format == "csv":
+            for line_number, row in enumerate(csv.reader(file), 1):
+                if not row:
+                    continue
+                if len(row) != 2:
+                    raise ValueError(
+                        f"Line {line_number}: expected name "
+                        "and measurement unit"
+                    )
+                yield row
+        else:
+            for number, item in enumerate(iter_json_array(file), 1):
+                try:
+                    yield item["name"], item["measurement_unit"]
+                except (KeyError, TypeError):
+                    raise ValueError(
+                        f"Item {number}: expected name "
+                        "and measurement_unit keys"
+                    )
+
+    def _read_batches(self, file, file_format, batch_size):
+        rows = (
+            (name.strip().lower(), measurement_unit.strip().lower())
+            for name, measurement_unit in self._read_rows(file, file_format)
+        )
+        while batch := list(islice(rows, batch_size)):
+            yield batch
+
+    def _load(self, batches):
+        """Inserts ingredients missing from each batch.
+
+        Returns numbers of read and inserted rows.
+        """
+        read = inserted = 0
+        for batch in batches:
+            read += len(batch)
+            unique_rows = dict.fromkeys(batch)
+            existing = set(
+                Ingredient.objects.filter(
+                    name__in={name for name, _ in unique_rows}
+                ).values_list("name", "measurement_unit")
+            )
+            new_ingredients = [
+                Ingredient(name=name, measurement_unit=measurement_unit)
+                for name, measurement_unit in unique_rows
+                if (name, measurement_unit) not in existing
+            ]
+            Ingredient.objects.bulk_create(new_ingredients)
+            inserted += len(new_ingredients)
+        return read, inserted
+
+    def _copy(self, batches):
+        """Loads all rows with COPY, then inserts the new ones at once.
+
+        Returns numbers of read and inserted rows.
+        """
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        read = 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMPORARY TABLE ingredient_staging ("
+                "name varchar(256), measurement_unit varchar(256)"
+                ") ON COMMIT DROP"
+            )
+            for batch in batches:
+                read += len(batch)
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    "COPY ingredient_staging (name, measurement_unit) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+            cursor.execute(
+                f"INSERT INTO {table} (name, measurement_unit) "
+                "SELECT DISTINCT name, measurement_unit "
+                "FROM ingredient_staging "
+                "ON CONFLICT (name, measurement_unit) DO NOTHING"
+            )
+            return read, cursor.rowcount
 
     def handle(self, *args, **options):
         file_path = options["file_path"]
+        file_format = options["format"] or (
+            "csv" if Path(file_path).suffix.lower() == ".csv" else "json"
+        )
+        if options["copy"] and connection.vendor != "postgresql":
+            self.stdout.write(
+                self.style.ERROR("--copy is only supported on PostgreSQL")
+            )
+            return
 
         try:
-            with open(file_path, "r", encoding="utf-8") as file:
-                data = json.load(file)
-
-            with transaction.atomic():
-                ingredients_to_create = [
-                    Ingredient(
-                        name=item["name"].lower(),
-                        measurement_unit=item["measurement_unit"].lower(),
-                    )
-                    for item in data
-                ]
-
-                # Используем bulk_create для эффективной вставки
-                Ingredient.objects.bulk_create(
-                    ingredients_to_create,
-                    ignore_conflicts=True,
+            started = time.monotonic()
+            with open(
+                file_path, "r", encoding="utf-8", newline=""
+            ) as file, transaction.atomic():
+                batches = self._read_batches(
+                    file, file_format, options["batch_size"]
                 )
+                if options["copy"]:
+                    read, inserted = self._copy(batches)
+                else:
+                    read, inserted = self._load(batches)
+            elapsed = max(time.monotonic() - started, 1e-6)
+
+            # bulk_create does not send post_save signals
+            if inserted:
+                invalidate_ingredient_catalogue()
 
-            total_ingredients = len(ingredients_to_create)
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Successfully loaded {total_ingredients} ingredients"
+                    f"Successfully loaded {read} ingredients "
+                    f"in {elapsed:.2f}s ({read / elapsed:.0f} rows/s): "
+                    f"{inserted} inserted, {read - inserted} skipped"
                 )
             )
 
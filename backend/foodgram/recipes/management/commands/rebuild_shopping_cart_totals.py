@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Sum
+
+from recipes.models import RecipeIngredient, ShoppingCartTotal
+
+
+class Command(BaseCommand):
+    help = "Rebuild and verify shopping cart ingredient totals"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only compare stored totals with shopping carts",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of totals inserted per query",
+        )
+
+    def _expected_totals(self):
+        return (
+            RecipeIngredient.objects.filter(recipe__shoppingcarts__isnull=False)
+            .values_list("recipe__shoppingcarts__user", "ingredient")
+            .annotate(total_amount=Sum("amount"))
+            .order_by()
+            .iterator()
+        )
+
+    def _find_mismatches(self):
+        stored = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount in (
+                ShoppingCartTotal.objects.values_list(
+                    "user", "ingredient", "total_amount"
+                ).iterator()
+            )
+        }
+        mismatches = []
+        for user_id, ingredient_id, total_amount in self._expected_totals():
+            stored_amount = stored.pop((user_id, ingredient_id), None)
+            if stored_amount != total_amount:
+                mismatches.append(
+                    (user_id, ingredient_id, stored_amount, total_amount)
+                )
+        mismatches.extend(
+            (user_id, ingredient_id, stored_amount, None)
+            for (user_id, ingredient_id), stored_amount in stored.items()
+        )
+        return mismatches
+
+    def _rebuild(self, batch_size):
+        ShoppingCartTotal.objects.all().delete()
+        batch = []
+        created = 0
+        for user_id, ingredient_id, total_amount in self._expected_totals():
+            batch.append(
+                ShoppingCartTotal(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    total_amount=total_amount,
+                )
+            )
+            if len(batch) >= batch_size:
+                ShoppingCartTotal.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ShoppingCartTotal.objects.bulk_create(batch)
+        return created + len(batch)
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            with transaction.atomic():
+                created = self._rebuild(options["batch_size"])
+            self.stdout.write(f"Rebuilt {created} shopping cart totals")
+
+        mismatches = self._find_mismatches()
+        for user_id, ingredient_id, stored, expected in mismatches[:20]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"user={user_id} ingredient={ingredient_id}: "
+                    f"stored {stored}, expected {expected}"
+                )
+            )
+        if mismatches:
+            raise CommandError(
+                f"{len(mismatches)} shopping cart totals do not match"
+            )
+        self.stdout.write(
+            self.style.SUCCESS("Shopping cart totals are consistent")
+        )
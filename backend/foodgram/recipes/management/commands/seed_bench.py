@@ -0,0 +1,227 @@
+import random
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from PIL import Image
+
+from recipes.catalogue import invalidate_ingredient_catalogue
+from recipes.cooking_time import invalidate_cooking_time_buckets
+from recipes.response_cache import invalidate_recipe_responses
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    Subscription,
+    User,
+)
+
+EMAIL_DOMAIN = "bench.foodgram"
+INGREDIENT_PREFIX = "bench "
+MEASUREMENT_UNITS = ("г", "кг", "мл", "л", "шт.", "ст. л.", "ч. л.")
+WORDS = (
+    "томатный",
+    "куриный",
+    "сливочный",
+    "острый",
+    "домашний",
+    "овощной",
+    "сырный",
+    "грибной",
+    "запечённый",
+    "летний",
+)
+
+
+class Command(BaseCommand):
+    help = "Generate deterministic data for benchmarks"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10000)
+        parser.add_argument("--ingredients", type=int, default=2000)
+        parser.add_argument(
+            "--ingredients-per-recipe",
+            type=int,
+            default=8,
+            help="Maximum number of ingredients in a recipe",
+        )
+        parser.add_argument("--favorites-per-user", type=int, default=20)
+        parser.add_argument("--cart-per-user", type=int, default=5)
+        parser.add_argument("--subscriptions-per-user", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--password",
+            default="bench-password",
+            help="Password of all generated users",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=2000,
+            help="Number of rows inserted per query",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously generated data first",
+        )
+
+    def _clear(self):
+        Recipe.objects.filter(
+            author__email__endswith=f"@{EMAIL_DOMAIN}"
+        ).delete()
+        User.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}").delete()
+        Ingredient.objects.filter(name__startswith=INGREDIENT_PREFIX).delete()
+
+    def _save_image(self):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), (200, 120, 60)).save(buffer, "JPEG")
+        return default_storage.save(
+            "recipes/bench.jpg", ContentFile(buffer.getvalue())
+        )
+
+    def _sample_pairs(self, rng, user_ids, targets, per_user, exclude_self):
+        for user_id in user_ids:
+            count = min(per_user, len(targets))
+            for target_id in rng.sample(targets, count):
+                if not (exclude_self and target_id == user_id):
+                    yield user_id, target_id
+
+    def _create_users(self, count, password, batch_size):
+        password = make_password(password)
+        users = User.objects.bulk_create(
+            (
+                User(
+                    email=f"user{i}@{EMAIL_DOMAIN}",
+                    username=f"bench_user{i}",
+                    first_name=f"Имя{i}",
+                    last_name=f"Фамилия{i}",
+                    password=password,
+                )
+                for i in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        return [user.pk for user in users]
+
+    def _create_ingredients(self, rng, count, batch_size):
+        ingredients = Ingredient.objects.bulk_create(
+            (
+                Ingredient(
+                    name=f"{INGREDIENT_PREFIX}{rng.choice(WORDS)} {i}",
+                    measurement_unit=rng.choice(MEASUREMENT_UNITS),
+                )
+                for i in range(count)
+            ),
+            batch_size=batch_size,
+        )
+        return [ingredient.pk for ingredient in ingredients]
+
+    def _create_recipes(self, rng, count, options, user_ids, ingredient_ids):
+        image = self._save_image()
+        batch_size = options["batch_size"]
+        recipe_ingredients = []
+        recipes = []
+        for i in range(count):
+            ingredients = rng.sample(
+                ingredient_ids,
+                rng.randint(
+                    1,
+                    min(
+                        options["ingredients_per_recipe"], len(ingredient_ids)
+                    ),
+                ),
+            )
+            recipe_ingredients.append(ingredients)
+            recipes.append(
+                Recipe(
+                    author_id=rng.choice(user_ids),
+                    name=f"{rng.choice(WORDS).capitalize()} рецепт {i}",
+                    text=" ".join(rng.choices(WORDS, k=30)),
+                    cooking_time=rng.randint(1, 180),
+                    image=image,
+                    ingredient_ids=sorted(ingredients),
+                )
+            )
+        Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+        RecipeIngredient.objects.bulk_create(
+            (
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for recipe, ingredients in zip(recipes, recipe_ingredients)
+                for ingredient_id in ingredients
+            ),
+            batch_size=batch_size,
+        )
+        return [recipe.pk for recipe in recipes]
+
+    @transaction.atomic
+    def _seed(self, options):
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+        user_ids = self._create_users(
+            options["users"], options["password"], batch_size
+        )
+        ingredient_ids = self._create_ingredients(
+            rng, options["ingredients"], batch_size
+        )
+        recipe_ids = self._create_recipes(
+            rng, options["recipes"], options, user_ids, ingredient_ids
+        )
+
+        for model, per_user in (
+            (FavoriteRecipe, options["favorites_per_user"]),
+            (ShoppingCart, options["cart_per_user"]),
+        ):
+            model.objects.bulk_create(
+                (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in self._sample_pairs(
+                        rng, user_ids, recipe_ids, per_user, False
+                    )
+                ),
+                batch_size=batch_size,
+            )
+        Subscription.objects.bulk_create(
+            (
+                Subscription(user_id=user_id, author_id=author_id)
+                for user_id, author_id in self._sample_pairs(
+                    rng,
+                    user_ids,
+                    user_ids,
+                    options["subscriptions_per_user"],
+                    True,
+                )
+            ),
+            batch_size=batch_size,
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            self._clear()
+        self._seed(options)
+
+        # bulk_create skips ShoppingCart.save() and model signals
+        call_command("rebuild_shopping_cart_totals", stdout=self.stdout)
+        invalidate_ingredient_catalogue()
+        invalidate_cooking_time_buckets()
+        invalidate_recipe_responses()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated {options['users']} users, "
+                f"{options['ingredients']} ingredients and "
+                f"{options['recipes']} recipes. "
+                f"Log in as user0@{EMAIL_DOMAIN}."
+            )
+        )
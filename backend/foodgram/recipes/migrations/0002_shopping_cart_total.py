@@ -0,0 +1,87 @@
+# Generated by Django 5.1.7 on 2026-10-17 22:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_shopping_cart_totals(apps, schema_editor):
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    ShoppingCartTotal = apps.get_model("recipes", "ShoppingCartTotal")
+    totals = (
+        RecipeIngredient.objects.filter(recipe__shoppingcarts__isnull=False)
+        .values_list("recipe__shoppingcarts__user", "ingredient")
+        .annotate(total_amount=Sum("amount"))
+        .order_by()
+    )
+    ShoppingCartTotal.objects.bulk_create(
+        (
+            ShoppingCartTotal(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total_amount,
+            )
+            for user_id, ingredient_id, total_amount in totals.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ShoppingCartTotal",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "total_amount",
+                    models.PositiveIntegerField(verbose_name="общее количество"),
+                ),
+                (
+                    "ingredient",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shoppingcarttotals",
+                        to="recipes.ingredient",
+                        verbose_name="ингредиент",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="shoppingcarttotals",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="пользователь",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "итог списка покупок",
+                "verbose_name_plural": "итоги списков покупок",
+                "ordering": ("user", "ingredient"),
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "ingredient"), name="unique_shopping_cart_total"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(
+            fill_shopping_cart_totals, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations
+
+# Ingredient search filters by UPPER(name) LIKE 'X%' and '%X%'
+# (istartswith/icontains), which the default btree index cannot serve.
+INDEXES = (
+    (
+        "recipes_ingredient_name_upper_like",
+        "CREATE INDEX IF NOT EXISTS recipes_ingredient_name_upper_like "
+        "ON recipes_ingredient (UPPER(name) text_pattern_ops)",
+    ),
+    (
+        "recipes_ingredient_name_upper_trgm",
+        "CREATE INDEX IF NOT EXISTS recipes_ingredient_name_upper_trgm "
+        "ON recipes_ingredient USING gin (UPPER(name) gin_trgm_ops)",
+    ),
+)
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for _, sql in INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0002_shopping_cart_total"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
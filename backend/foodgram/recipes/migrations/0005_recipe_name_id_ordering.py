@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0004_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="recipe",
+            options={
+                "ordering": ("name", "id"),
+                "verbose_name": "рецепт",
+                "verbose_name_plural": "рецепты",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["name", "id"], name="recipe_name_id_idx"),
+        ),
+    ]
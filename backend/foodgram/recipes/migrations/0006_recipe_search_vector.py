@@ -0,0 +1,141 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:30
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# Recipe.search_vector combines the name (weight A), ingredient names (B)
+# and text (C) with russian stemming. Triggers keep it current when any
+# of them changes. Statement triggers on recipes_recipeingredient see all
+# rows of a bulk insert/delete at once through transition tables.
+CREATE_SQL = """
+CREATE OR REPLACE FUNCTION recipes_recipe_search_vector(
+    recipe_name varchar, recipe_text text, recipe_id bigint
+) RETURNS tsvector AS $$
+    SELECT
+        setweight(to_tsvector('russian', coalesce(recipe_name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce((
+            SELECT string_agg(ingredient.name, ' ')
+            FROM recipes_recipeingredient AS recipe_ingredient
+            JOIN recipes_ingredient AS ingredient
+                ON ingredient.id = recipe_ingredient.ingredient_id
+            WHERE recipe_ingredient.recipe_id
+                = recipes_recipe_search_vector.recipe_id
+        ), '')), 'B')
+        || setweight(to_tsvector('russian', coalesce(recipe_text, '')), 'C')
+$$ LANGUAGE sql STABLE;
+
+CREATE OR REPLACE FUNCTION recipes_recipe_search_vector_trigger()
+RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := recipes_recipe_search_vector(
+        NEW.name, NEW.text, NEW.id
+    );
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+    FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector_trigger();
+
+CREATE OR REPLACE FUNCTION recipes_recipeingredient_search_vector_trigger()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe
+    SET search_vector = recipes_recipe_search_vector(name, text, id)
+    WHERE id IN (
+        SELECT recipe_id FROM changed_rows
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipeingredient_search_vector_insert
+    AFTER INSERT ON recipes_recipeingredient
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION recipes_recipeingredient_search_vector_trigger();
+
+CREATE TRIGGER recipes_recipeingredient_search_vector_update
+    AFTER UPDATE ON recipes_recipeingredient
+    REFERENCING NEW TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION recipes_recipeingredient_search_vector_trigger();
+
+CREATE TRIGGER recipes_recipeingredient_search_vector_delete
+    AFTER DELETE ON recipes_recipeingredient
+    REFERENCING OLD TABLE AS changed_rows
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION recipes_recipeingredient_search_vector_trigger();
+
+CREATE OR REPLACE FUNCTION recipes_ingredient_search_vector_trigger()
+RETURNS trigger AS $$
+BEGIN
+    UPDATE recipes_recipe
+    SET search_vector = recipes_recipe_search_vector(name, text, id)
+    WHERE id IN (
+        SELECT recipe_id FROM recipes_recipeingredient
+        WHERE ingredient_id = NEW.id
+    );
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_ingredient_search_vector_update
+    AFTER UPDATE OF name ON recipes_ingredient
+    FOR EACH ROW EXECUTE FUNCTION recipes_ingredient_search_vector_trigger();
+
+UPDATE recipes_recipe
+SET search_vector = recipes_recipe_search_vector(name, text, id);
+
+CREATE INDEX recipes_recipe_search_vector_gin
+    ON recipes_recipe USING gin (search_vector);
+"""
+
+DROP_SQL = """
+DROP INDEX IF EXISTS recipes_recipe_search_vector_gin;
+DROP TRIGGER IF EXISTS recipes_ingredient_search_vector_update
+    ON recipes_ingredient;
+DROP TRIGGER IF EXISTS recipes_recipeingredient_search_vector_delete
+    ON recipes_recipeingredient;
+DROP TRIGGER IF EXISTS recipes_recipeingredient_search_vector_update
+    ON recipes_recipeingredient;
+DROP TRIGGER IF EXISTS recipes_recipeingredient_search_vector_insert
+    ON recipes_recipeingredient;
+DROP TRIGGER IF EXISTS recipes_recipe_search_vector_update
+    ON recipes_recipe;
+DROP FUNCTION IF EXISTS recipes_ingredient_search_vector_trigger();
+DROP FUNCTION IF EXISTS recipes_recipeingredient_search_vector_trigger();
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector_trigger();
+DROP FUNCTION IF EXISTS recipes_recipe_search_vector(varchar, text, bigint);
+"""
+
+
+def create_search_vector_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(CREATE_SQL)
+
+
+def drop_search_vector_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(DROP_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0005_recipe_name_id_ordering"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            create_search_vector_triggers, drop_search_vector_triggers
+        ),
+    ]
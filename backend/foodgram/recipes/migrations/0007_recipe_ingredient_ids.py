@@ -0,0 +1,71 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:40
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+import recipes.fields
+
+INDEX_NAME = "recipe_ingredient_ids_gin"
+
+
+def fill_ingredient_ids(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+    if schema_editor.connection.vendor != "postgresql":
+        for recipe_id in Recipe.objects.values_list("pk", flat=True):
+            Recipe.objects.filter(pk=recipe_id).update(
+                ingredient_ids=sorted(
+                    RecipeIngredient.objects.filter(
+                        recipe=recipe_id
+                    ).values_list("ingredient", flat=True)
+                )
+            )
+        return
+
+    Recipe.objects.filter(recipe_ingredients__isnull=False).update(
+        ingredient_ids=Subquery(
+            RecipeIngredient.objects.filter(recipe=OuterRef("pk"))
+            .values("recipe")
+            .annotate(ids=ArrayAgg("ingredient", ordering="ingredient"))
+            .values("ids")
+        )
+    )
+
+
+# The GIN index serves @> and && lookups, which exist on PostgreSQL only
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} "
+            "ON recipes_recipe USING gin (ingredient_ids)"
+        )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(f"DROP INDEX IF EXISTS {INDEX_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="recipe",
+            name="ingredient_ids",
+            field=recipes.fields.PortableArrayField(
+                base_field=models.IntegerField(),
+                blank=True,
+                default=list,
+                editable=False,
+                size=None,
+                verbose_name="id ингредиентов",
+            ),
+        ),
+        migrations.RunPython(fill_ingredient_ids, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
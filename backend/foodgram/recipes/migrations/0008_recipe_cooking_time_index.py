@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-17 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0007_recipe_ingredient_ids"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="recipe",
+            index=models.Index(fields=["cooking_time"], name="recipe_cooking_time_idx"),
+        ),
+    ]
@@ -1,8 +1,11 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, transaction
 from django.core.validators import MinValueValidator
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 
+from .fields import PortableArrayField
+
 
 class User(AbstractUser):
     """Foodgram user model"""
@@ -93,15 +96,50 @@ class Recipe(models.Model):
         validators=[MinValueValidator(1)],
     )
     image = models.ImageField("изображение", upload_to="recipes/")
+    image_variants = models.JSONField(
+        "уменьшенные изображения", default=dict, blank=True, editable=False
+    )
+    # Maintained by database triggers on PostgreSQL, see migration 0006
+    search_vector = SearchVectorField(null=True, editable=False)
+    # Sorted ids of recipe_ingredients for @> and && lookups on PostgreSQL,
+    # GIN-indexed by migration 0007
+    ingredient_ids = PortableArrayField(
+        models.IntegerField(),
+        verbose_name="id ингредиентов",
+        default=list,
+        blank=True,
+        editable=False,
+    )
 
     class Meta:
-        ordering = ("name",)
+        ordering = ("name", "id")
         verbose_name = "рецепт"
         verbose_name_plural = "рецепты"
+        indexes = [
+            models.Index(fields=["name", "id"], name="recipe_name_id_idx"),
+            models.Index(
+                fields=["cooking_time"], name="recipe_cooking_time_idx"
+            ),
+        ]
 
     def __str__(self):
         return self.name
 
+    def get_ingredient_amounts(self):
+        """Returns amounts of the recipe ingredients by ingredient id"""
+        return dict(
+            self.recipe_ingredients.values_list("ingredient", "amount")
+        )
+
+    def update_ingredient_ids(self):
+        """Copies ids of recipe_ingredients to ingredient_ids"""
+        self.ingredient_ids = sorted(
+            self.recipe_ingredients.values_list("ingredient", flat=True)
+        )
+        Recipe.objects.filter(pk=self.pk).update(
+            ingredient_ids=self.ingredient_ids
+        )
+
 
 class Ingredient(models.Model):
     """Ingredient model"""
@@ -205,3 +243,135 @@ class ShoppingCart(UserRecipeRelation):
     class Meta(UserRecipeRelation.Meta):
         verbose_name = "рецепт в списке покупок"
         verbose_name_plural = "рецепты в списке покупок"
+
+    @transaction.atomic
+    def save(self, *args, **kwargs):
+        # Signal receivers update the totals in the same transaction
+        super().save(*args, **kwargs)
+
+
+# Rows per INSERT of totals, within the SQLite parameter limit
+INSERT_BATCH_SIZE = 300
+
+
+class ShoppingCartTotalManager(models.Manager):
+    """Keeps ingredient totals in sync with shopping carts.
+
+    Called by the ShoppingCart signal receivers, see recipes.signals.
+    """
+
+    def _get_amounts(self, recipe_id):
+        return dict(
+            RecipeIngredient.objects.filter(recipe=recipe_id).values_list(
+                "ingredient", "amount"
+            )
+        )
+
+    def add_recipe(self, user_ids, recipe_id):
+        self.apply_changes(user_ids, self._get_amounts(recipe_id))
+
+    def remove_recipe(self, user_ids, recipe_id):
+        self.apply_changes(
+            user_ids,
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount in (
+                    self._get_amounts(recipe_id).items()
+                )
+            },
+        )
+
+    def _insert_or_add(self, rows):
+        """Inserts totals, adding to rows inserted concurrently."""
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                batch = rows[start:start + INSERT_BATCH_SIZE]
+                values = ", ".join(["(%s, %s, %s)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {table} "
+                    "(user_id, ingredient_id, total_amount) "
+                    f"VALUES {values} "
+                    "ON CONFLICT (user_id, ingredient_id) DO UPDATE "
+                    f"SET total_amount = {table}.total_amount "
+                    "+ EXCLUDED.total_amount",
+                    [value for row in batch for value in row],
+                )
+
+    def apply_changes(self, user_ids, changes):
+        """Adds amount changes by ingredient id to totals of the users.
+
+        Must be called inside the transaction that changes the carts.
+        """
+        user_ids = list(user_ids)
+        changes = {
+            ingredient_id: delta
+            for ingredient_id, delta in changes.items()
+            if delta
+        }
+        if not user_ids or not changes:
+            return
+
+        totals = {
+            (total.user_id, total.ingredient_id): total
+            for total in self.select_for_update().filter(
+                user__in=user_ids, ingredient__in=changes
+            )
+        }
+        to_create, to_update, to_delete = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, delta in changes.items():
+                total = totals.get((user_id, ingredient_id))
+                if total is None:
+                    if delta > 0:
+                        to_create.append((user_id, ingredient_id, delta))
+                    continue
+
+                total.total_amount += delta
+                if total.total_amount > 0:
+                    to_update.append(total)
+                else:
+                    to_delete.append(total.pk)
+
+        self.filter(pk__in=to_delete).delete()
+        self.bulk_update(to_update, ["total_amount"])
+        if to_create:
+            self._insert_or_add(to_create)
+
+
+class ShoppingCartTotal(models.Model):
+    """Ingredient totals of user shopping carts"""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shoppingcarttotals",
+        verbose_name="пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="shoppingcarttotals",
+        verbose_name="ингредиент",
+    )
+    total_amount = models.PositiveIntegerField("общее количество")
+
+    objects = ShoppingCartTotalManager()
+
+    class Meta:
+        ordering = ("user", "ingredient")
+        verbose_name = "итог списка покупок"
+        verbose_name_plural = "итоги списков покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_cart_total",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.user} - {self.ingredient.name} "
+            f"{self.total_amount} {self.ingredient.measurement_unit}"
+        )
@@ -0,0 +1,48 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_VERSION_KEY = "recipe_responses_version"
+RECIPE_VERSION_KEY = "recipe_response_version:{}"
+
+# User fields shown in recipe responses
+AUTHOR_FIELDS = frozenset(
+    ("email", "username", "first_name", "last_name", "avatar")
+)
+
+
+def _get_version(key):
+    # Starts from the current time, so a version lost with the cache
+    # can never match responses cached before.
+    return cache.get_or_set(key, time.time_ns, timeout=None)
+
+
+def get_list_version():
+    return _get_version(LIST_VERSION_KEY)
+
+
+def get_recipe_version(recipe_id):
+    return _get_version(RECIPE_VERSION_KEY.format(recipe_id))
+
+
+def get_recipe_versions(recipe_ids):
+    """Returns versions of many recipes with two cache requests at most."""
+    keys = {RECIPE_VERSION_KEY.format(pk): pk for pk in recipe_ids}
+    versions = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return {pk: versions[key] for key, pk in keys.items()}
+
+
+def invalidate_recipe_responses(recipe_ids=()):
+    """Drops cached recipe lists and the details of the given recipes.
+
+    Runs after the commit, so a response built from the old rows
+    cannot be cached under the new versions.
+    """
+    keys = [LIST_VERSION_KEY]
+    keys.extend(RECIPE_VERSION_KEY.format(pk) for pk in recipe_ids)
+    transaction.on_commit(lambda: cache.delete_many(keys))
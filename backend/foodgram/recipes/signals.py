@@ -0,0 +1,150 @@
+from django.db import connections
+from django.db.models import F, Func, QuerySet, Value
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from .catalogue import invalidate_ingredient_catalogue
+from .cooking_time import invalidate_cooking_time_buckets
+from .images import schedule_image_variants
+from .models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartTotal,
+    User,
+)
+from .response_cache import AUTHOR_FIELDS, invalidate_recipe_responses
+
+
+def _recipes_with_ingredient(ingredient_id, using):
+    # Array lookups on ingredient_ids exist on PostgreSQL only
+    if connections[using].vendor == "postgresql":
+        return Recipe.objects.filter(ingredient_ids__contains=[ingredient_id])
+    return Recipe.objects.filter(recipe_ingredients__ingredient=ingredient_id)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, **kwargs):
+    invalidate_ingredient_catalogue()
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields, **kwargs):
+    invalidate_cooking_time_buckets()
+    invalidate_recipe_responses([instance.pk])
+    # image_variants of the instance may be older than those in the table
+    if update_fields is None or "image" in update_fields:
+        schedule_image_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    invalidate_cooking_time_buckets()
+    invalidate_recipe_responses([instance.pk])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipe_responses([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, using, **kwargs):
+    if created:
+        return
+    recipe_ids = list(
+        _recipes_with_ingredient(instance.pk, using).values_list(
+            "pk", flat=True
+        )
+    )
+    if recipe_ids:
+        invalidate_recipe_responses(recipe_ids)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields, **kwargs):
+    # Logins only update last_login
+    if created or (update_fields and not AUTHOR_FIELDS & update_fields):
+        return
+    recipe_ids = list(instance.recipes.values_list("pk", flat=True))
+    if recipe_ids:
+        invalidate_recipe_responses(recipe_ids)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def ingredient_deleting(sender, instance, using, **kwargs):
+    if connections[using].vendor != "postgresql":
+        # Recipe ingredients are deleted by the cascade before post_delete
+        instance.recipe_ids = list(
+            _recipes_with_ingredient(instance.pk, using).values_list(
+                "pk", flat=True
+            )
+        )
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, using, **kwargs):
+    if connections[using].vendor != "postgresql":
+        for recipe in Recipe.objects.filter(pk__in=instance.recipe_ids):
+            recipe.update_ingredient_ids()
+        return
+
+    Recipe.objects.filter(ingredient_ids__contains=[instance.pk]).update(
+        ingredient_ids=Func(
+            F("ingredient_ids"), Value(instance.pk), function="array_remove"
+        )
+    )
+
+
+@receiver(pre_save, sender=ShoppingCart)
+def shopping_cart_saving(sender, instance, **kwargs):
+    # An admin edit can move an existing row to another user or recipe
+    instance.previous = (
+        None
+        if instance._state.adding
+        else ShoppingCart.objects.filter(pk=instance.pk)
+        .values_list("user", "recipe")
+        .first()
+    )
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(sender, instance, **kwargs):
+    current = (instance.user_id, instance.recipe_id)
+    if instance.previous == current:
+        return
+    if instance.previous is not None:
+        user_id, recipe_id = instance.previous
+        ShoppingCartTotal.objects.remove_recipe([user_id], recipe_id)
+    ShoppingCartTotal.objects.add_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def shopping_cart_deleting(sender, instance, origin, **kwargs):
+    # Carts of a deleted recipe are handled by recipe_deleting at once,
+    # totals of a deleted user are removed by the cascade
+    deleted = origin.model if isinstance(origin, QuerySet) else type(origin)
+    if deleted in (Recipe, User):
+        return
+    ShoppingCartTotal.objects.remove_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    # Sent before the cascade removes the recipe ingredients the amounts
+    # come from
+    ShoppingCartTotal.objects.remove_recipe(
+        instance.shoppingcarts.values_list("user", flat=True), instance.pk
+    )
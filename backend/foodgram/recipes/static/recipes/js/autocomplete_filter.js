@@ -0,0 +1,12 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    $(function() {
+        $('form.autocomplete-filter select').on('change', function() {
+            // A cleared filter must not send an empty lookup value
+            this.disabled = !this.value;
+            this.form.submit();
+        });
+    });
+}
@@ -0,0 +1,102 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from recipes.models import (
+    FavoriteRecipe,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    Subscription,
+    User,
+)
+
+ROWS = 100
+
+
+class ChangelistQueriesTest(TestCase):
+    """Changelists of 100 rows do not query the database per row."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email="admin@example.com",
+            username="admin",
+            first_name="Admin",
+            last_name="Admin",
+            password="password",
+        )
+        users = User.objects.bulk_create(
+            User(
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                first_name="User",
+                last_name="User",
+            )
+            for i in range(ROWS)
+        )
+        ingredients = Ingredient.objects.bulk_create(
+            Ingredient(
+                name=f"ingredient {i}", measurement_unit=f"unit {i % 5}"
+            )
+            for i in range(ROWS)
+        )
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=users[i],
+                name=f"recipe {i}",
+                text="text",
+                cooking_time=i + 1,
+                image="recipes/image.png",
+            )
+            for i in range(ROWS)
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(i + k) % ROWS],
+                amount=k + 1,
+            )
+            for i, recipe in enumerate(recipes)
+            for k in range(3)
+        )
+        FavoriteRecipe.objects.bulk_create(
+            FavoriteRecipe(user=users[(i + 1) % ROWS], recipe=recipe)
+            for i, recipe in enumerate(recipes)
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=user, author=users[(i + 1) % ROWS])
+            for i, user in enumerate(users)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def get_changelist(self, model, queries):
+        url = reverse(f"admin:recipes_{model}_changelist")
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        result_list = response.context["cl"].result_list
+        self.assertEqual(len(result_list), ROWS)
+        return result_list
+
+    # Every changelist starts with the session and the admin user
+    # and counts the filtered and all rows
+
+    def test_user_changelist(self):
+        users = self.get_changelist("user", 5)
+        self.assertEqual(users[1].recipes_count, 1)
+        self.assertEqual(users[1].followers_count, 1)
+        self.assertEqual(users[1].following_count, 1)
+
+    def test_recipe_changelist(self):
+        # Cooking time buckets, recipes, ingredients of recipes
+        recipes = self.get_changelist("recipe", 8)
+        self.assertEqual(recipes[0].favorites_count, 1)
+
+    def test_ingredient_changelist(self):
+        # Ingredients, measurement units of the filter
+        ingredients = self.get_changelist("ingredient", 6)
+        self.assertEqual(ingredients[0].recipes_count, 3)
@@ -0,0 +1,19 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.catalogue import get_version
+from recipes.models import Ingredient
+
+
+class CatalogueVersionTest(TestCase):
+    """Ingredient changes bump the catalogue version after the commit."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_version_changes_after_commit(self):
+        version = get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Ingredient.objects.create(name="salt", measurement_unit="г")
+            self.assertEqual(get_version(), version)
+        self.assertNotEqual(get_version(), version)
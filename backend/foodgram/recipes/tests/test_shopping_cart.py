@@ -0,0 +1,86 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import (
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    ShoppingCart,
+    ShoppingCartTotal,
+    User,
+)
+
+
+class ShoppingCartTotalTest(TestCase):
+    """Deleting recipes and users keeps the cart totals in sync."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(
+                email=f"user{i}@example.com",
+                username=f"user{i}",
+                first_name="User",
+                last_name="User",
+            )
+            for i in range(30)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f"ingredient {i}", measurement_unit="г")
+            for i in range(3)
+        )
+
+    def create_recipe(self, author, carts):
+        recipe = Recipe.objects.create(
+            author=author, name="recipe", text="text", cooking_time=1
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in self.ingredients
+        )
+        for user in self.users[:carts]:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        return recipe
+
+    def get_totals(self, user):
+        return dict(
+            ShoppingCartTotal.objects.filter(user=user).values_list(
+                "ingredient", "total_amount"
+            )
+        )
+
+    def delete_recipe(self, recipe):
+        with CaptureQueriesContext(connection) as queries:
+            recipe.delete()
+        return len(queries)
+
+    def test_recipe_delete_queries_do_not_depend_on_carts(self):
+        author = self.users[0]
+        self.assertEqual(
+            self.delete_recipe(self.create_recipe(author, 30)),
+            self.delete_recipe(self.create_recipe(author, 2)),
+        )
+        self.assertFalse(ShoppingCartTotal.objects.exists())
+
+    def test_recipe_delete_keeps_other_recipes(self):
+        kept = self.create_recipe(self.users[0], 5)
+        self.create_recipe(self.users[1], 5).delete()
+        expected = {ingredient.pk: 10 for ingredient in self.ingredients}
+        for user in self.users[:5]:
+            self.assertEqual(self.get_totals(user), expected)
+        kept.delete()
+        self.assertFalse(ShoppingCartTotal.objects.exists())
+
+    def test_user_delete(self):
+        recipe = self.create_recipe(self.users[0], 5)
+        self.create_recipe(self.users[1], 5)
+        self.users[2].delete()
+        self.users[1].delete()
+        expected = {ingredient.pk: 10 for ingredient in self.ingredients}
+        for user in (self.users[0], *self.users[3:5]):
+            self.assertEqual(self.get_totals(user), expected)
+        ShoppingCart.objects.filter(user=self.users[0], recipe=recipe).delete()
+        self.assertFalse(
+            ShoppingCartTotal.objects.filter(user=self.users[0]).exists()
+        )